@@ -0,0 +1,336 @@
+"""
+Run coalescing: turn the run requests of several sensors into as few runs as possible.
+
+Several triggers ask for the same downstream assets at nearly the same moment: both
+file-change sensors when the handmade files are saved together, the freshness sensors
+when the dumps go stale on the same night, the upstream sensors on a fresh instance,
+and eager automation reacting to all of them. Sensors wrapped with `coalesced` do not
+launch their own runs; they queue their request in a shared pending store, which the
+`coalesced_refresh_sensor` drains:
+
+- It waits until no request arrived for `window_seconds` (but at most
+  `max_wait_seconds` after the first one), then launches ONE run that selects the
+  union of the pending selections.
+- A request is dropped when a run (in flight or succeeded, eager automation runs
+  included) already selects all of its assets and is guaranteed to see the change
+  that triggered it.
+- While an older run is still materializing some of the assets, the batch is held
+  back, so no asset is materialized by two runs at once.
+
+Requests are kept in the JSON file `PENDING_RUNS_STATE_FILE_PATH`, guarded by a lock
+file because sensors may be evaluated concurrently. A request stays in the store until
+a tick starts with a committed cursor at or past its id, so a tick whose result is not
+committed (an error, a failed launch) sees the same requests again.
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Set, Union
+
+import dagster as dg
+
+from .defs.assets import constants
+
+COALESCING_SENSOR_NAME = "coalesced_refresh_sensor"
+# Tag of a RunRequest with the time of the change it reacts to (edge-triggered sensors)
+CHANGED_AT_TAG = "imdb_dagster/changed_at"
+# Tag of a coalesced run with the sensors it was requested by
+SOURCES_TAG = "imdb_dagster/coalesced_sources"
+# A lock file older than this was left behind by an evaluation that died holding it
+STALE_LOCK_SECONDS = 60
+IN_FLIGHT_RUN_STATUSES = [
+    dg.DagsterRunStatus.QUEUED,
+    dg.DagsterRunStatus.NOT_STARTED,
+    dg.DagsterRunStatus.STARTING,
+    dg.DagsterRunStatus.STARTED,
+]
+
+
+@contextmanager
+def _file_lock(lock_path: str, timeout_seconds: float = 30) -> Iterator[None]:
+    """Exclusive lock held by creating `lock_path`; portable, unlike flock."""
+    deadline: float = time.time() + timeout_seconds
+    while True:
+        try:
+            fd: int = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"Could not lock {lock_path} in {timeout_seconds}s")
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+@contextmanager
+def _locked_store(path: str = constants.PENDING_RUNS_STATE_FILE_PATH) -> Iterator[dict]:
+    """The pending store, locked; changes to the yielded dict are written back."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _file_lock(f"{path}.lock"):
+        store: dict = {"next_id": 1, "consumed_through": 0, "requests": []}
+        if os.path.exists(path):
+            with open(path) as f:
+                store = json.load(f)
+        yield store
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(store, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def enqueue(
+    source: str,
+    asset_keys: Set[dg.AssetKey],
+    reason: Optional[str] = None,
+    changed_at: Optional[float] = None,
+) -> int:
+    """
+    Queue a request for the coalescing sensor.
+
+    A pending request of the same sensor for the same assets is replaced (keeping its
+    queue time), so a sensor firing repeatedly within one window is a single request.
+
+    Args:
+        source: name of the requesting sensor.
+        asset_keys: assets to materialize.
+        reason: the run key the sensor would have used, for the logs.
+        changed_at: time of the change the request reacts to. A run only covers the
+            request when it was created after this time. Without it, the request is
+            about a state (e.g. "never materialized") that any in-flight run fixes.
+
+    Returns:
+        The id of the queued request.
+    """
+    now: float = time.time()
+    selection: List[str] = sorted(key.to_user_string() for key in asset_keys)
+    with _locked_store() as store:
+        requests: List[dict] = [
+            request
+            for request in store["requests"]
+            if request["id"] > store["consumed_through"]
+        ]
+        queued_at: float = now
+        for request in requests:
+            if request["source"] == source and request["asset_keys"] == selection:
+                queued_at = request["queued_at"]
+                if request["changed_at"] is not None and changed_at is not None:
+                    changed_at = max(changed_at, request["changed_at"])
+                requests.remove(request)
+                break
+
+        # A replaced request gets a new id, so a coalescing tick that already read the
+        # old one still sees the new one on its next tick
+        request_id: int = store["next_id"]
+        requests.append(
+            {
+                "id": request_id,
+                "source": source,
+                "asset_keys": selection,
+                "reason": reason,
+                "changed_at": changed_at,
+                "queued_at": queued_at,
+                "requested_at": now,
+            }
+        )
+        store["next_id"] = request_id + 1
+        store["requests"] = requests
+    return request_id
+
+
+def last_request_id(path: str = constants.PENDING_RUNS_STATE_FILE_PATH) -> int:
+    """Id of the last request queued (replaced requests included); 0 before any."""
+    with _locked_store(path) as store:
+        return store["next_id"] - 1
+
+
+def _target_keys(target, asset_graph) -> Set[dg.AssetKey]:
+    """Asset keys of a sensor target: an asset job or a list of asset keys."""
+    if hasattr(target, "selection"):
+        return set(target.selection.resolve(asset_graph))
+    return set(dg.AssetSelection.assets(*target).resolve(asset_graph))
+
+
+def coalesced(source: str, target) -> Callable:
+    """
+    Decorator for a sensor evaluation function: a returned RunRequest is queued for the
+    coalescing sensor (see `enqueue`) instead of being launched.
+
+    Args:
+        source: name of the sensor.
+        target: job or asset keys of the sensor, used when the RunRequest itself has
+            no asset selection.
+    """
+
+    def decorator(evaluate: Callable) -> Callable:
+        @functools.wraps(evaluate)
+        def _coalesced(context: dg.SensorEvaluationContext):
+            result = evaluate(context)
+            if not isinstance(result, dg.RunRequest):
+                return result
+
+            asset_keys: Set[dg.AssetKey] = set(
+                result.asset_selection
+                or _target_keys(target, context.repository_def.asset_graph)
+            )
+            changed_at: Optional[str] = result.tags.get(CHANGED_AT_TAG)
+            request_id: int = enqueue(
+                source,
+                asset_keys,
+                result.run_key,
+                float(changed_at) if changed_at is not None else None,
+            )
+            context.log.info(
+                f"Queued request {request_id} ({len(asset_keys)} assets) for "
+                f"{COALESCING_SENSOR_NAME}"
+            )
+            return dg.SkipReason(
+                f"Queued {len(asset_keys)} assets for {COALESCING_SENSOR_NAME}"
+            )
+
+        return _coalesced
+
+    return decorator
+
+
+def run_asset_keys(run: dg.DagsterRun, repository_def) -> Set[dg.AssetKey]:
+    """Assets a run materializes: its asset selection, or all assets of its job."""
+    if run.asset_selection is not None:
+        return set(run.asset_selection)
+    if repository_def is None or not repository_def.has_job(run.job_name):
+        return set()
+    return set(repository_def.get_job(run.job_name).asset_layer.selected_asset_keys)
+
+
+def _covers(
+    run_keys: Set[dg.AssetKey], in_flight: bool, created_at: float, request: dict
+) -> bool:
+    """Whether a run (in flight or succeeded) makes a pending request superfluous."""
+    if not {dg.AssetKey.from_user_string(key) for key in request["asset_keys"]} <= run_keys:
+        return False
+    if request["changed_at"] is not None:
+        return created_at >= request["changed_at"]
+    return in_flight or created_at >= request["requested_at"]
+
+
+def coalesce(
+    context: dg.SensorEvaluationContext,
+    window_seconds: float = constants.COALESCE_WINDOW_SECONDS,
+    max_wait_seconds: float = constants.COALESCE_MAX_WAIT_SECONDS,
+) -> Union[dg.SensorResult, dg.SkipReason]:
+    """
+    Evaluate the coalescing sensor: launch one run for the pending requests.
+
+    The cursor is the id of the last request handled. Dagster commits it together
+    with the run request, so only requests at or below the committed cursor are
+    pruned from the store; a tick whose result was not committed retries the same
+    requests, and the run key (the range of request ids) deduplicates the run.
+    """
+    handled_through: int = int(context.cursor) if context.cursor else 0
+    with _locked_store() as store:
+        store["consumed_through"] = max(store["consumed_through"], handled_through)
+        store["requests"] = [
+            request for request in store["requests"] if request["id"] > handled_through
+        ]
+        pending: List[dict] = list(store["requests"])
+    if not pending:
+        return dg.SkipReason("No pending requests")
+
+    now: float = time.time()
+    if (
+        now - max(request["requested_at"] for request in pending) < window_seconds
+        and now - min(request["queued_at"] for request in pending) < max_wait_seconds
+    ):
+        return dg.SkipReason(f"Waiting for more requests ({len(pending)} pending)")
+
+    instance: dg.DagsterInstance = context.instance
+    oldest: float = min(
+        min(request["requested_at"], request["changed_at"] or request["requested_at"])
+        for request in pending
+    )
+    records = instance.get_run_records(
+        filters=dg.RunsFilter(statuses=IN_FLIGHT_RUN_STATUSES)
+    ) + instance.get_run_records(
+        filters=dg.RunsFilter(
+            statuses=[dg.DagsterRunStatus.SUCCESS],
+            created_after=datetime.fromtimestamp(oldest, tz=timezone.utc),
+        )
+    )
+    runs = [
+        (
+            run_asset_keys(record.dagster_run, context.repository_def),
+            record.dagster_run.status in IN_FLIGHT_RUN_STATUSES,
+            record.create_timestamp.timestamp(),
+            record.dagster_run.run_id,
+        )
+        for record in records
+    ]
+
+    remaining: List[dict] = []
+    for request in pending:
+        covering: Optional[str] = next(
+            (
+                run_id
+                for run_keys, in_flight, created_at, run_id in runs
+                if _covers(run_keys, in_flight, created_at, request)
+            ),
+            None,
+        )
+        if covering is None:
+            remaining.append(request)
+        else:
+            context.log.info(
+                f"Dropped request {request['id']} of {request['source']}: covered by run {covering}"
+            )
+
+    last_id: int = max(request["id"] for request in pending)
+    if not remaining:
+        return dg.SensorResult(
+            skip_reason=f"All {len(pending)} pending requests are covered by existing runs",
+            cursor=str(last_id),
+        )
+
+    selection: Set[dg.AssetKey] = {
+        dg.AssetKey.from_user_string(key)
+        for request in remaining
+        for key in request["asset_keys"]
+    }
+    busy: Dict[str, Set[dg.AssetKey]] = {
+        run_id: run_keys & selection
+        for run_keys, in_flight, _, run_id in runs
+        if in_flight and run_keys & selection
+    }
+    if busy:
+        return dg.SkipReason(
+            f"Holding back {len(remaining)} requests while run(s) {sorted(busy)} "
+            "materialize some of the same assets"
+        )
+
+    sources: List[str] = sorted({request["source"] for request in remaining})
+    context.log.info(
+        f"Coalesced {len(remaining)} requests of {', '.join(sources)} into one run "
+        f"of {len(selection)} assets"
+    )
+    return dg.SensorResult(
+        run_requests=[
+            dg.RunRequest(
+                run_key=f"coalesced_{pending[0]['id']}_{last_id}",
+                asset_selection=sorted(selection, key=lambda key: key.to_user_string()),
+                tags={SOURCES_TAG: ",".join(sources)},
+            )
+        ],
+        cursor=str(last_id),
+    )
+
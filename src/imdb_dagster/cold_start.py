@@ -0,0 +1,98 @@
+"""
+Cold-start budget for loading the project definitions.
+
+Code-server reloads, sensor evaluations and `dg list defs` all import
+`imdb_dagster.definitions` in a fresh interpreter, so heavy libraries must stay
+deferred to the assets that need them. Run the check with:
+
+    python -m imdb_dagster.cold_start
+"""
+
+import json
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Budgets for a fresh interpreter loading the definitions (dagster itself included)
+MAX_LOAD_SECONDS = 5.0
+MAX_IMPORTED_MODULES = 1400
+# Modules that may only be imported by the assets that need them
+FORBIDDEN_MODULE_PREFIXES = (
+    "bokeh",
+    "requests",
+    "pyarrow.parquet",
+    "pyarrow.dataset",
+    "src.",  # the package must only be loaded under its canonical name
+)
+
+_MEASURE_SCRIPT = """
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+from imdb_dagster.definitions import defs
+defs()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(set(sys.modules) - before)}))
+"""
+
+
+def measure_definition_load() -> Dict[str, object]:
+    """
+    Load the definitions in a fresh interpreter and measure the cost.
+
+    Returns:
+        Dict with the load time in seconds and the names of the newly imported modules.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_budget(
+    measurement: Dict[str, object], max_seconds: Optional[float] = MAX_LOAD_SECONDS
+) -> List[str]:
+    """
+    Compare a measurement against the cold-start budget.
+
+    Args:
+        measurement: result of measure_definition_load.
+        max_seconds: load time budget; None to only check the imported modules,
+            which (unlike the wall-clock time) does not depend on the machine.
+
+    Returns:
+        Human readable budget violations; empty when within budget.
+    """
+    violations = []
+    if max_seconds is not None and measurement["seconds"] > max_seconds:
+        violations.append(
+            f"definitions loaded in {measurement['seconds']:.2f}s (> {max_seconds}s)"
+        )
+    if len(measurement["modules"]) > MAX_IMPORTED_MODULES:
+        violations.append(
+            f"{len(measurement['modules'])} modules imported (> {MAX_IMPORTED_MODULES})"
+        )
+    forbidden = [
+        module
+        for module in measurement["modules"]
+        if module.startswith(FORBIDDEN_MODULE_PREFIXES)
+        or module in {prefix.rstrip(".") for prefix in FORBIDDEN_MODULE_PREFIXES}
+    ]
+    if forbidden:
+        violations.append(f"eagerly imported: {forbidden}")
+    return violations
+
+
+if __name__ == "__main__":
+    result = measure_definition_load()
+    problems = check_budget(result)
+    print(
+        f"definitions loaded in {result['seconds']:.2f}s, "
+        f"{len(result['modules'])} modules imported"
+    )
+    for problem in problems:
+        print(f"  over budget: {problem}")
+    sys.exit(1 if problems else 0)
@@ -2,7 +2,9 @@ from pathlib import Path
 
 from dagster import definitions, load_from_defs_folder
 
+from .profiling import profile_definitions
+
 
 @definitions
 def defs():
-    return load_from_defs_folder(path_within_project=Path(__file__).parent)
+    return profile_definitions(load_from_defs_folder(path_within_project=Path(__file__).parent))
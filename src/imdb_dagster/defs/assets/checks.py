@@ -1,139 +1,168 @@
 import dagster as dg
 import pandas as pd
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List
 
-from src.imdb_dagster.defs.assets import constants
-from .data_assets.inputs import (
-    title_basics,
-    watched_dates_and_scores,
-    watch_status,
-)
-
-
-# -------------------------------------------------------------------
-# Check: watch_status has no duplicate tconst
-# -------------------------------------------------------------------
-@dg.asset_check(asset=watch_status, blocking=True)
-def watch_status_has_no_duplicate_tconst() -> dg.AssetCheckResult:
-    """Ensure the watch_status CSV contains no duplicate tconst values."""
-
-    dtypes = {
-        "tconst": pd.StringDtype(),
-        "watched": pd.BooleanDtype(),
-        "priority": pd.BooleanDtype(),
-        "netflix": pd.BooleanDtype(),
-        "prime": pd.BooleanDtype(),
-    }
+from ... import helpers
 
-    df = pd.read_csv(
-        constants.STATUS_FILE_PATH,
-        dtype=dtypes,
-        index_col="tconst",
-    )
+# Failing rows shown per check in the failure table
+FAILURE_PREVIEW_ROWS = 50
+# Inputs loaded once and shared by all rules
+RULE_INPUTS = ["watch_status", "watched_dates_and_scores", "title_basics"]
 
-    duplicated_mask = df.index.duplicated()
-    duplicates = df.index[duplicated_mask].tolist()
-
-    return dg.AssetCheckResult(
-        passed=len(duplicates) == 0,
-        metadata={"duplicates": duplicates},
-    )
 
+@dataclass(frozen=True)
+class Rule:
+    """
+    One asset check, declared as a vectorized failure mask over the rule facts.
 
-# -------------------------------------------------------------------
-# Factory: generic tconst existence check
-# -------------------------------------------------------------------
-def create_tconst_check(asset_name: str) -> dg.AssetCheckResult:
+    `source` names the input whose rows are tested; `fails` maps the facts of
+    those rows (see rule_facts) to a boolean Series that is True for failing rows.
     """
-    Creates a check ensuring that all tconst values in `asset`
-    exist in title_basics.
+
+    name: str
+    asset: str
+    source: str
+    fails: Callable[[pd.DataFrame], pd.Series]
+    description: str
+    metadata_key: str = "missing_tconst"
+    # Summary of the failing tconst values in the "message" metadata
+    failure_message: str = "Missing tconst values"
+
+
+RULES: List[Rule] = [
+    Rule(
+        name="watch_status_has_no_duplicate_tconst",
+        asset="watch_status",
+        source="watch_status",
+        fails=lambda facts: facts["duplicated"],
+        description="Ensure the watch_status CSV contains no duplicate tconst values.",
+        metadata_key="duplicates",
+        failure_message="Duplicate tconst values",
+    ),
+    Rule(
+        name="watch_status_tconst_exists_in_title_basics",
+        asset="watch_status",
+        source="watch_status",
+        fails=lambda facts: ~facts["in_title_basics"],
+        description="Ensure all tconst values in watch_status exist in title_basics.",
+    ),
+    Rule(
+        name="watched_dates_and_scores_tconst_exists_in_title_basics",
+        asset="watched_dates_and_scores",
+        source="watched_dates_and_scores",
+        fails=lambda facts: ~facts["in_title_basics"],
+        description="Ensure all tconst values in watched_dates_and_scores exist in title_basics.",
+    ),
+    Rule(
+        name="watched_dates_and_scores_tconst_in_watch_status",
+        asset="watch_status",
+        source="watched_dates_and_scores",
+        fails=lambda facts: ~facts["in_watch_status"],
+        description="Ensure all tconst values in watched_dates_and_scores exist in watch_status.",
+    ),
+    Rule(
+        name="watched_dates_and_scores_marked_as_watched",
+        asset="watch_status",
+        source="watched_dates_and_scores",
+        fails=lambda facts: facts["watched_in_watch_status"].eq(False),
+        description="Ensures that any movie with a watched date is marked watched=True in watch_status.",
+        metadata_key="not_watched_in_watch_status",
+        failure_message="Not marked watched in watch_status",
+    ),
+]
+
+
+def rule_facts(
+    watch_status: pd.DataFrame,
+    watched_dates_and_scores: pd.DataFrame,
+    title_basics: pd.DataFrame,
+) -> Dict[str, pd.DataFrame]:
     """
+    Every fact the rules test, per row of each source, in one vectorized pass.
 
-    @dg.asset_check(
-        asset=asset_name,
-        name=f"{asset_name}_tconst_exists_in_title_basics",
-        additional_ins={"title_basics": dg.AssetIn("title_basics")},
-        blocking=True,
-    )
-    def _check(context, asset_value, title_basics) -> dg.AssetCheckResult:
-        # asset_value is the value of the asset being checked (comes from the decorator "asset")
-        # title_basics comes from additional_ins
-        # NOTE: the asset to be checked must always come first
-        missing = asset_value.index.difference(title_basics.index).tolist()
-        passed = len(missing) == 0
-
-        return dg.AssetCheckResult(
-            passed=passed,
-            metadata={
-                "missing_tconst": missing,
-            },
-        )
+    The inputs are only read: facts are new frames aligned with the source rows.
+    """
+    status_keys: pd.Index = watch_status.index
+    dates_keys: pd.Index = watched_dates_and_scores.index
 
-    return _check
+    # One lookup of the keys of both sources in the (large) title_basics index
+    in_title_basics = title_basics.index.get_indexer(status_keys.append(dates_keys)) >= 0
 
+    first_status: pd.DataFrame = watch_status[~status_keys.duplicated()]
+    watched: pd.Series = first_status["watched"].reindex(dates_keys)
 
-# Instantiate checks
-watch_status_check: dg.AssetCheckResult = create_tconst_check("watch_status")
-watched_dates_check: dg.AssetCheckResult = create_tconst_check(
-    "watched_dates_and_scores"
-)
+    return {
+        "watch_status": pd.DataFrame(
+            {
+                "duplicated": status_keys.duplicated(),
+                "in_title_basics": in_title_basics[: len(status_keys)],
+            },
+            index=status_keys,
+        ),
+        "watched_dates_and_scores": pd.DataFrame(
+            {
+                "in_title_basics": in_title_basics[len(status_keys):],
+                "in_watch_status": first_status.index.get_indexer(dates_keys) >= 0,
+                "watched_in_watch_status": watched.array,
+            },
+            index=dates_keys,
+        ),
+    }
 
 
-# -------------------------------------------------------------------
-# Check: watched_dates_and_scores tconst must exist in watch_status
-# -------------------------------------------------------------------
-@dg.asset_check(
-    asset=watch_status,
-    name="watched_dates_and_scores_tconst_in_watch_status",
-    additional_ins={"watched_dates_and_scores": dg.AssetIn("watched_dates_and_scores")},
-    blocking=True,
-)
-def tconsts_in_watch_status(
-    context, watch_status: pd.DataFrame, watched_dates_and_scores: pd.DataFrame
-) -> dg.AssetCheckResult:
-    missing: list = watched_dates_and_scores.index.difference(
-        watch_status.index
-    ).tolist()
-    passed = len(missing) == 0
+def evaluate_rule(rule: Rule, source: pd.DataFrame, facts: pd.DataFrame) -> dg.AssetCheckResult:
+    """Check result of one rule with a table of the failing source rows and their facts."""
+    mask = rule.fails(facts).fillna(False).to_numpy(bool)
+    failures: pd.DataFrame = pd.concat(
+        [source[mask].reset_index(), facts[mask].reset_index(drop=True)], axis=1
+    )
+    failing_tconst: list = failures["tconst"].unique().tolist()
 
     return dg.AssetCheckResult(
-        passed=passed,
+        asset_key=rule.asset,
+        check_name=rule.name,
+        passed=not mask.any(),
         metadata={
-            "missing_tconst": missing,
             "message": (
-                "All tconst values in watched_dates_and_scores exist in watch_status"
-                if passed
-                else f"Missing tconst values: {missing}"
+                f"{rule.failure_message}: {failing_tconst}" if mask.any() else "No failing rows"
             ),
+            rule.metadata_key: failing_tconst,
+            "failing_rows": dg.MetadataValue.int(int(mask.sum())),
+            "failures": helpers.get_table_schema(failures, max_preview=FAILURE_PREVIEW_ROWS),
         },
     )
 
 
-# -------------------------------------------------------------------
-# Check: watched_dates_and_scores entries must be marked watched=True in watch_status
-# -------------------------------------------------------------------
-@dg.asset_check(
-    asset=watch_status,
-    name="watched_dates_and_scores_marked_as_watched",
-    additional_ins={"watched_dates_and_scores": dg.AssetIn("watched_dates_and_scores")},
-    blocking=True,
+@dg.multi_asset_check(
+    name="validate_inputs",
+    specs=[
+        dg.AssetCheckSpec(
+            rule.name,
+            asset=rule.asset,
+            additional_deps=[name for name in RULE_INPUTS if name != rule.asset],
+            blocking=True,
+            description=rule.description,
+        )
+        for rule in RULES
+    ],
+    ins={name: dg.AssetIn(name) for name in RULE_INPUTS},
+    can_subset=True,
 )
-def watched_dates_marked_as_watched(
-    context, watch_status: pd.DataFrame, watched_dates_and_scores: pd.DataFrame
-) -> dg.AssetCheckResult:
-    """
-    Ensures that any movie with a watched date is marked watched=True in watch_status.
-    """
-    watched_dates_and_scores["watched"] = True
-
-    # Align only overlapping indices
-    overlap: pd.DataFrame = watched_dates_and_scores.join(
-        watch_status, how="inner", lsuffix="_wd", rsuffix="_ws"
+def validate_inputs(
+    context, watch_status, watched_dates_and_scores, title_basics
+) -> Iterable[dg.AssetCheckResult]:
+    """Evaluate all rules over one shared load of each input."""
+    facts: Dict[str, pd.DataFrame] = rule_facts(
+        watch_status, watched_dates_and_scores, title_basics
     )
+    sources: Dict[str, pd.DataFrame] = {
+        "watch_status": watch_status,
+        "watched_dates_and_scores": watched_dates_and_scores,
+    }
 
-    all_true_in_ws = bool(overlap["watched_ws"].all())
-    mismatch: list = overlap[overlap["watched_ws"] == False].index.unique().to_list()
-
-    return dg.AssetCheckResult(
-        passed=all_true_in_ws,
-        metadata={"message": f"not true in watch_status: {mismatch}"},
-    )
+    # Jobs may select only some of the checks (e.g. watch_status_job)
+    selected = context.selected_asset_check_keys
+    for rule in RULES:
+        if dg.AssetCheckKey(dg.AssetKey(rule.asset), rule.name) in selected:
+            yield evaluate_rule(rule, sources[rule.source], facts[rule.source])
@@ -2,11 +2,64 @@ import dagster as dg
 
 TITLE_BASICS_FILE_PATH = "data/inputs/imdb_files/title.basics.tsv.gz"
 TITLE_RATINGS_FILE_PATH = "data/inputs/imdb_files/title.ratings.tsv.gz"
+TITLE_PRINCIPALS_FILE_PATH = "data/inputs/imdb_files/title.principals.tsv.gz"
+TITLE_CREW_FILE_PATH = "data/inputs/imdb_files/title.crew.tsv.gz"
+NAME_BASICS_FILE_PATH = "data/inputs/imdb_files/name.basics.tsv.gz"
+# Direct-address array of the ratings (record n is title tt<n>), written by title_ratings_array
+TITLE_RATINGS_ARRAY_FILE_PATH = "data/inputs/imdb_files/title.ratings.npy"
 DATES_AND_SCORES_FILE_PATH = "data/inputs/handmade_files/date_scores.csv"
 STATUS_FILE_PATH = "data/inputs/handmade_files/status.csv"
 PRODUCT_EXCEL_FILE_PATH = "data/outputs/watch_list.xlsx"
 PRODUCT_FIGURE_FILE_PATH = "data/outputs/watch_list.html"
+PRODUCT_SITE_DIR_PATH = "data/outputs/watch_list_site"
+QUERY_STORE_DIR_PATH = "data/outputs/query_store"
+PRODUCT_SQLITE_FILE_PATH = "data/outputs/watch_list.sqlite"
+PRODUCT_HISTORY_HTML_FILE_PATH = "data/outputs/viewing_history.html"
+VIEWING_HISTORY_STATE_FILE_PATH = "data/state/viewing_history.json"
+PENDING_RUNS_STATE_FILE_PATH = "data/state/pending_runs.json"
+PROFILE_DIR_PATH = "data/profiles"
+# Memory-mapped copies of the cached assets (see resources.CachingFilesystemIOManager)
+DATASET_CACHE_DIR_PATH = "data/cache/datasets"
+DATA_DIR_PATH = "data"
 file_a = "data/inputs/imdb_files/robots.txt"
+
+# Dataset files downloaded at the same time (one pooled HTTP session)
+MAX_CONCURRENT_DOWNLOADS = 4
+# Seconds without data from the server before a download is abandoned
+DOWNLOAD_TIMEOUT_SECONDS = 60
+# Run coalescing: seconds without a new request before the pending requests are
+# launched as one run, and the longest a request waits for the window to close
+COALESCE_WINDOW_SECONDS = 30
+COALESCE_MAX_WAIT_SECONDS = 300
+# Storage retention: versions kept per versioned store (run storage, profiles, query
+# store; dumps are replaced in place), size cap of all managed stores and
+# age after which an unfinished .download/.tmp file is considered abandoned
+RETENTION_KEEP_VERSIONS = 3
+RETENTION_MAX_BYTES = 20 * 1024**3
+RETENTION_TEMP_MAX_AGE_HOURS = 6
+# Rows per chunk when streaming the large IMDb dumps (principals, crew, names)
+STREAM_CHUNK_SIZE = 500_000
+# Number of top-billed actors/actresses kept per title
+LEAD_ACTOR_COUNT = 3
+
+# Typed columns of the Parquet copies of the IMDb dumps (other columns are strings)
+TITLE_BASICS_PARQUET_TYPES = {"startYear": "int32", "runtimeMinutes": "int32"}
+TITLE_RATINGS_PARQUET_TYPES = {"averageRating": "float32", "numVotes": "int32"}
+TITLE_PRINCIPALS_PARQUET_TYPES = {"ordering": "int32"}
+# Arrow types of the handmade files, so every asset shares one Arrow-backed schema
+STATUS_ARROW_TYPES = {
+    "tconst": "string",
+    "watched": "bool",
+    "priority": "bool",
+    "netflix": "bool",
+    "prime": "bool",
+}
+DATES_AND_SCORES_ARROW_TYPES = {
+    "tconst": "string",
+    "date": "date32",
+    "enjoyment_score": "float32",
+    "quality_score": "float32",
+}
 # unsynced_condition = (
 #     (
 #         dg.AutomationCondition.any_deps_updated()  # Any upstream has updated
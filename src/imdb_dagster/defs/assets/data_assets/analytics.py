@@ -0,0 +1,374 @@
+import dagster as dg
+import json
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .. import constants
+from .inputs import watched_dates_and_scores
+from .intermediates import needed_title_basics, needed_title_ratings
+
+# Bump to force a full rebuild of the persisted running state
+HISTORY_STATE_VERSION = 3
+# Months in the rolling score averages
+ROLLING_MONTHS = 3
+# Score columns correlated against the IMDb averageRating
+SCORE_COLUMNS = ["enjoyment_score", "quality_score"]
+FLOAT32 = pd.ArrowDtype(pa.float32())
+
+
+def _empty_state() -> dict:
+    return {
+        "version": HISTORY_STATE_VERSION,
+        "data_versions": {},
+        # Content hashes (see review_hashes) of the rows folded into the aggregates
+        "row_hashes": [],
+        # Hashes (see title_hashes) of the ratings and genres the aggregates were built with
+        "rating_hashes": [],
+        "genre_hashes": [],
+        "months": {},
+        "correlation": {
+            score: {"n": 0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "syy": 0.0, "sxy": 0.0}
+            for score in SCORE_COLUMNS
+        },
+    }
+
+
+def _load_state(file_path: str) -> Optional[dict]:
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "r") as f:
+        state: dict = json.load(f)
+    return state if state.get("version") == HISTORY_STATE_VERSION else None
+
+
+def _save_state(state: dict, file_path: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, file_path)
+
+
+def review_hashes(watched_dates_and_scores: pd.DataFrame) -> np.ndarray:
+    """
+    Content hash (uint64) of every review row, vectorized.
+
+    The hash covers only the review itself: tconst, date, scores and the occurrence
+    of otherwise identical rows (a movie can be watched twice on one day). An edited
+    row therefore shows up as one hash gone and one hash new, while a refresh of
+    the IMDb data leaves the hashes alone.
+    """
+    rows = pd.DataFrame(
+        {
+            "tconst": watched_dates_and_scores.index.astype(object),
+            "date": watched_dates_and_scores["date"].to_numpy(),
+            **{
+                score: watched_dates_and_scores[score].to_numpy(dtype="float64", na_value=np.nan)
+                for score in SCORE_COLUMNS
+            },
+        }
+    )
+    rows["occurrence"] = rows.groupby(list(rows.columns), dropna=False).cumcount()
+    return pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+
+def title_hashes(titles: pd.DataFrame, tconsts: pd.Index) -> np.ndarray:
+    """Hash (uint64) of the tconst and the values of every reviewed title."""
+    return pd.util.hash_pandas_object(titles.reindex(tconsts.unique()), index=True).to_numpy()
+
+
+def _genre_columns(needed_title_basics: pd.DataFrame) -> List[str]:
+    return [col for col in needed_title_basics.columns if col.startswith("genre_")]
+
+
+def month_aggregates(
+    watched_dates_and_scores: pd.DataFrame, needed_title_basics: pd.DataFrame
+) -> dict:
+    """Watches, score sums and genre counts per month of review rows."""
+    genre_columns: List[str] = _genre_columns(needed_title_basics)
+    dated: pd.DataFrame = watched_dates_and_scores[watched_dates_and_scores["date"].notna()]
+    rows = pd.DataFrame(
+        {
+            "month": dated["date"].dt.strftime("%Y-%m").to_numpy(dtype=object),
+            **{
+                score: dated[score].to_numpy(dtype="float64", na_value=np.nan)
+                for score in SCORE_COLUMNS
+            },
+        }
+    )
+    grouped = rows.groupby("month")
+    watches: pd.Series = grouped.size()
+    sums: pd.DataFrame = grouped[SCORE_COLUMNS].sum()
+    counts: pd.DataFrame = grouped[SCORE_COLUMNS].count()
+
+    # One count per (month, genre) combination, from the genre flags of each row's title
+    flags = pd.DataFrame(
+        needed_title_basics[genre_columns]
+        .reindex(dated.index)
+        .to_numpy(dtype=bool, na_value=False),
+        columns=[col.removeprefix("genre_") for col in genre_columns],
+    )
+    genre_counts: pd.DataFrame = flags.groupby(rows["month"].to_numpy()).sum()
+
+    months: dict = {}
+    for month in watches.index:
+        months[month] = {
+            score: {"sum": float(sums.at[month, score]), "n": int(counts.at[month, score])}
+            for score in SCORE_COLUMNS
+        } | {
+            "watches": int(watches[month]),
+            "genres": {
+                genre: int(n) for genre, n in genre_counts.loc[month].items() if n > 0
+            },
+        }
+    return months
+
+
+def correlation_sums(
+    watched_dates_and_scores: pd.DataFrame, needed_title_ratings: pd.DataFrame
+) -> dict:
+    """Sums for the Pearson correlation of the IMDb averageRating with each score."""
+    rating: np.ndarray = (
+        needed_title_ratings["averageRating"]
+        .reindex(watched_dates_and_scores.index)
+        .to_numpy(dtype="float64", na_value=np.nan)
+    )
+    sums: dict = {}
+    for score in SCORE_COLUMNS:
+        values: np.ndarray = watched_dates_and_scores[score].to_numpy(
+            dtype="float64", na_value=np.nan
+        )
+        both: np.ndarray = ~np.isnan(rating) & ~np.isnan(values)
+        x, y = rating[both], values[both]
+        sums[score] = {
+            "n": int(both.sum()),
+            "sx": float(x.sum()),
+            "sy": float(y.sum()),
+            "sxx": float((x * x).sum()),
+            "syy": float((y * y).sum()),
+            "sxy": float((x * y).sum()),
+        }
+    return sums
+
+
+def merge_aggregates(state: dict, part: dict) -> None:
+    """Add the aggregates of newly seen rows to the running state."""
+    for month, totals in part["months"].items():
+        if month not in state["months"]:
+            state["months"][month] = totals
+            continue
+        target: dict = state["months"][month]
+        target["watches"] += totals["watches"]
+        for score in SCORE_COLUMNS:
+            target[score]["sum"] += totals[score]["sum"]
+            target[score]["n"] += totals[score]["n"]
+        for genre, n in totals["genres"].items():
+            target["genres"][genre] = target["genres"].get(genre, 0) + n
+
+    for score in SCORE_COLUMNS:
+        for name, value in part["correlation"][score].items():
+            state["correlation"][score][name] += value
+
+
+def _gone(stored: List[int], current: np.ndarray) -> int:
+    """Number of stored hashes that are no longer among the current ones."""
+    return int((~np.isin(np.array(stored, dtype=np.uint64), current)).sum())
+
+
+def fold_history(
+    state: Optional[dict],
+    watched_dates_and_scores: pd.DataFrame,
+    needed_title_basics: pd.DataFrame,
+    needed_title_ratings: pd.DataFrame,
+) -> dict:
+    """
+    Bring the running state up to date with the current reviews and IMDb data.
+
+    - New review rows are folded into the aggregates.
+    - A rating that changed (the daily title_ratings refresh) only recomputes the
+      correlation sums, over all rows.
+    - An edited or removed row, or a title whose genres changed, rebuilds the
+      aggregates (vectorized) from all rows: an aggregate can't give back a row
+      it no longer knows.
+
+    Args:
+        state: running state, or None to build it from scratch; updated in place.
+
+    Returns:
+        The mode ("incremental", "rerated" or "full_rebuild"), the number of folded
+        and changed rows, and the state.
+    """
+    hashes: np.ndarray = review_hashes(watched_dates_and_scores)
+    rating_hashes: np.ndarray = title_hashes(
+        needed_title_ratings[["averageRating"]], watched_dates_and_scores.index
+    )
+    genre_hashes: np.ndarray = title_hashes(
+        needed_title_basics[_genre_columns(needed_title_basics)],
+        watched_dates_and_scores.index,
+    )
+
+    changed_rows: int = _gone(state["row_hashes"], hashes) if state else 0
+    if state is None or changed_rows or _gone(state["genre_hashes"], genre_hashes):
+        mode = "full_rebuild"
+        state = _empty_state()
+        new_rows: pd.DataFrame = watched_dates_and_scores
+    else:
+        mode = "rerated" if _gone(state["rating_hashes"], rating_hashes) else "incremental"
+        new_rows = watched_dates_and_scores[
+            ~np.isin(hashes, np.array(state["row_hashes"], dtype=np.uint64))
+        ]
+
+    if mode == "rerated":
+        state["correlation"] = correlation_sums(watched_dates_and_scores, needed_title_ratings)
+    merge_aggregates(
+        state,
+        {
+            "months": month_aggregates(new_rows, needed_title_basics),
+            "correlation": (
+                _empty_state()["correlation"]
+                if mode == "rerated"
+                else correlation_sums(new_rows, needed_title_ratings)
+            ),
+        },
+    )
+
+    state["row_hashes"] = hashes.tolist()
+    state["rating_hashes"] = rating_hashes.tolist()
+    state["genre_hashes"] = genre_hashes.tolist()
+    return {
+        "mode": mode,
+        "folded_rows": len(new_rows),
+        "changed_rows": changed_rows,
+        "state": state,
+    }
+
+
+def monthly_frame(state: dict) -> pd.DataFrame:
+    """Watches, (rolling) average scores and genre mix per month from the running state."""
+    months: List[str] = sorted(state["months"])
+    totals: List[dict] = [state["months"][month] for month in months]
+
+    df = pd.DataFrame(
+        {
+            "watches": [t["watches"] for t in totals],
+            **{
+                f"{score}_sum": [t[score]["sum"] for t in totals] for score in SCORE_COLUMNS
+            },
+            **{f"{score}_n": [t[score]["n"] for t in totals] for score in SCORE_COLUMNS},
+        },
+        index=pd.PeriodIndex(months, freq="M", name="month"),
+    )
+    # Months without watches still count towards the rolling window
+    if len(df):
+        df = df.reindex(
+            pd.period_range(df.index.min(), df.index.max(), freq="M", name="month"),
+            fill_value=0,
+        )
+
+    for score in SCORE_COLUMNS:
+        sums: pd.Series = df.pop(f"{score}_sum")
+        counts: pd.Series = df.pop(f"{score}_n")
+        df[f"avg_{score}"] = (sums / counts.where(counts > 0)).astype(FLOAT32)
+        df[f"rolling_avg_{score}"] = (
+            sums.rolling(ROLLING_MONTHS, min_periods=1).sum()
+            / counts.rolling(ROLLING_MONTHS, min_periods=1).sum().where(lambda x: x > 0)
+        ).astype(FLOAT32)
+
+    genre_counts = pd.DataFrame(
+        [t["genres"] for t in totals], index=pd.PeriodIndex(months, freq="M", name="month")
+    ).reindex(df.index)
+    genre_share: pd.DataFrame = (
+        genre_counts.fillna(0)
+        .div(df["watches"].where(df["watches"] > 0), axis=0)
+        .astype(FLOAT32)
+        .add_prefix("share_")
+    )
+    genre_share = genre_share[sorted(genre_share.columns)]
+
+    df = df.join(genre_share).astype({"watches": pd.ArrowDtype(pa.int32())})
+    df.index = pd.Index(df.index.astype(str), dtype=pd.ArrowDtype(pa.string()), name="month")
+    return df
+
+
+def correlation_frame(state: dict) -> pd.DataFrame:
+    """Pearson correlation of the IMDb averageRating with each of my scores."""
+    rows: Dict[str, dict] = {}
+    for score in SCORE_COLUMNS:
+        s: dict = state["correlation"][score]
+        n: int = s["n"]
+        denominator: float = (n * s["sxx"] - s["sx"] ** 2) * (n * s["syy"] - s["sy"] ** 2)
+        rows[score] = {
+            "reviews": n,
+            "pearson_r": (
+                (n * s["sxy"] - s["sx"] * s["sy"]) / math.sqrt(denominator)
+                if n > 1 and denominator > 0
+                else float("nan")
+            ),
+        }
+    df = pd.DataFrame.from_dict(rows, orient="index").astype(
+        {"reviews": pd.ArrowDtype(pa.int32()), "pearson_r": pd.ArrowDtype(pa.float64())}
+    )
+    df.index = pd.Index(df.index, dtype=pd.ArrowDtype(pa.string()), name="score")
+    return df
+
+
+@dg.asset(
+    description="Watches per month, rolling average scores, genre mix and rating-vs-score correlation, maintained incrementally",
+    group_name="analytics",
+    deps=["watched_dates_and_scores", "needed_title_basics", "needed_title_ratings"],
+    automation_condition=dg.AutomationCondition.eager(),
+)
+def viewing_history_analytics(
+    context: dg.AssetExecutionContext,
+    watched_dates_and_scores=watched_dates_and_scores,
+    needed_title_basics=needed_title_basics,
+    needed_title_ratings=needed_title_ratings,
+) -> dg.MaterializeResult[Dict[str, pd.DataFrame]]:
+    # Data versions of the inputs; the running state is only touched when they moved
+    data_versions: Dict[str, Optional[str]] = {}
+    for name in ["watched_dates_and_scores", "needed_title_basics", "needed_title_ratings"]:
+        record = context.instance.get_latest_data_version_record(dg.AssetKey(name))
+        materialization = record.asset_materialization if record else None
+        data_versions[name] = (
+            materialization.tags.get("dagster/data_version") if materialization else None
+        )
+
+    state_path = constants.VIEWING_HISTORY_STATE_FILE_PATH
+    state: Optional[dict] = _load_state(state_path)
+
+    fold: dict = {"mode": "unchanged", "folded_rows": 0, "changed_rows": 0, "state": state}
+    if state is None or state["data_versions"] != data_versions:
+        fold = fold_history(
+            state, watched_dates_and_scores, needed_title_basics, needed_title_ratings
+        )
+        state = fold["state"]
+        state["data_versions"] = data_versions
+        _save_state(state, state_path)
+
+    analytics: Dict[str, pd.DataFrame] = {
+        "monthly": monthly_frame(state),
+        "correlation": correlation_frame(state),
+    }
+
+    return dg.MaterializeResult(
+        value=analytics,
+        metadata={
+            "mode": dg.MetadataValue.text(fold["mode"]),
+            "folded_rows": dg.MetadataValue.int(fold["folded_rows"]),
+            "changed_rows": dg.MetadataValue.int(fold["changed_rows"]),
+            "total_reviews": dg.MetadataValue.int(len(state["row_hashes"])),
+            "months": dg.MetadataValue.int(len(analytics["monthly"])),
+            **{
+                f"pearson_r_{score}": dg.MetadataValue.float(
+                    float(r) if pd.notna(r) else float("nan")
+                )
+                for score, r in analytics["correlation"]["pearson_r"].items()
+            },
+            "state_path": dg.MetadataValue.path(state_path),
+        },
+    )
@@ -1,16 +1,9 @@
 import dagster as dg
 import pandas as pd
 
-from src.imdb_dagster.defs.assets import constants
-from pathlib import Path
-import requests
-from datetime import datetime, timedelta
+from .. import constants
 from . import raw_inputs
 from .... import helpers
-from typing import List, Dict, Any
-
-
-from dagster import MetadataValue, TableRecord, TableSchema, TableColumn
 
 
 @dg.asset(
@@ -30,20 +23,19 @@ def title_basics(
         "runtimeMinutes",
         "genres",
     ]
-    dtypes = {"startYear": pd.Int32Dtype(), "runtimeMinutes": pd.Int32Dtype()}
+    dtypes = helpers.arrow_dtypes(constants.TITLE_BASICS_PARQUET_TYPES)
 
-    df = pd.read_csv(
+    df = helpers.read_dump(
         constants.TITLE_BASICS_FILE_PATH,
-        sep="\t",
-        quotechar="\t",
-        low_memory=False,
-        dtype_backend="pyarrow",
-        usecols=cols_to_use,
         index_col="tconst",
-        dtype=dtypes,
-        na_values="\\N",
+        dtypes=dtypes,
+        usecols=cols_to_use,
     )
 
+    memory_before: int = int(df.memory_usage(deep=True).sum())
+    df = helpers.compact_title_columns(df)
+    memory_after: int = int(df.memory_usage(deep=True).sum())
+
     meta_data: dg.MetadataValue = helpers.get_table_schema(df)
 
     return dg.MaterializeResult(
@@ -52,6 +44,11 @@ def title_basics(
             "dagster/column_schema": meta_data.schema,
             "first_10_rows": meta_data,
             "total_records": dg.MetadataValue.int(len(df)),
+            "memory_bytes_before_compaction": dg.MetadataValue.int(memory_before),
+            "memory_bytes": dg.MetadataValue.int(memory_after),
+            "original_titles_kept": dg.MetadataValue.int(
+                int(df["originalTitle"].notna().sum())
+            ),
         },
     )
 
@@ -65,17 +62,12 @@ def title_basics(
 def title_ratings(
     context: dg.AssetExecutionContext,
 ) -> dg.MaterializeResult[pd.DataFrame]:
-    dtypes = {"averageRating": pd.Float32Dtype(), "numVotes": pd.Int32Dtype()}
+    dtypes = helpers.arrow_dtypes(constants.TITLE_RATINGS_PARQUET_TYPES)
 
-    df = pd.read_csv(
+    df = helpers.read_dump(
         constants.TITLE_RATINGS_FILE_PATH,
-        sep="\t",
-        quotechar="\t",
-        low_memory=False,
-        dtype_backend="pyarrow",
         index_col="tconst",
-        dtype=dtypes,
-        na_values="\\N",
+        dtypes=dtypes,
     )
 
     meta_data: dg.MetadataValue = helpers.get_table_schema(df)
@@ -90,10 +82,32 @@ def title_ratings(
     )
 
 
+@dg.asset(
+    deps=["title_ratings"],
+    group_name="inputs",
+    description="title_ratings as a memory-mapped array file where record n is title tt<n>",
+    automation_condition=dg.AutomationCondition.eager(),
+)
+def title_ratings_array(title_ratings) -> dg.MaterializeResult[str]:
+    file_path = constants.TITLE_RATINGS_ARRAY_FILE_PATH
+    array_size: int = helpers.write_ratings_array(title_ratings, file_path)
+
+    # The value is the path; open it with helpers.open_ratings_array
+    return dg.MaterializeResult(
+        value=file_path,
+        metadata={
+            "file_path": dg.MetadataValue.path(file_path),
+            "file_size": dg.MetadataValue.int(array_size),
+            "total_records": dg.MetadataValue.int(len(title_ratings)),
+        },
+    )
+
+
 @dg.asset(
     group_name="inputs",
     description="The dates movies have been watched and scores I gave them",
     deps=[title_basics],
+    metadata={"source_file": constants.DATES_AND_SCORES_FILE_PATH},
     automation_condition=dg.AutomationCondition.eager(),
 )
 def watched_dates_and_scores(
@@ -108,20 +122,17 @@ def watched_dates_and_scores(
         if len(line.split(",")) != header_cols:
             context.log.warning(f"Line {i} has inconsistent number of columns")
 
-    dtypes = {
-        "tconst": pd.StringDtype(),
-        "enjoyment_score": pd.Float32Dtype(),
-        "quality_score": pd.Float32Dtype(),
-    }
+    dtypes = helpers.arrow_dtypes(constants.DATES_AND_SCORES_ARROW_TYPES)
+    date_dtype = dtypes.pop("date")
     df = pd.read_csv(
         constants.DATES_AND_SCORES_FILE_PATH,
         dtype=dtypes,
         index_col="tconst",
-        parse_dates=["date"],
+        dtype_backend="pyarrow",
     )
 
-    # Convert datetime to date to retain only the date component
-    df["date"] = df["date"].dt.date
+    # Dates are not zero-padded (2026-2-6), so parse them before casting to an Arrow date
+    df["date"] = pd.to_datetime(df["date"]).astype(date_dtype)
 
     date_count: pd.Series = df.date.isna().value_counts()
     enjoyment_count: pd.Series = df.enjoyment_score.isna().value_counts()
@@ -131,6 +142,7 @@ def watched_dates_and_scores(
 
     return dg.MaterializeResult(
         value=df,
+        data_version=dg.DataVersion(helpers.file_hash(constants.DATES_AND_SCORES_FILE_PATH)),
         metadata={
             "dagster/column_schema": meta_data.schema,
             "first_10_rows": meta_data,
@@ -149,6 +161,7 @@ def watched_dates_and_scores(
     group_name="inputs",
     description="My movie list with info about if they have been watched and where they can be viewed",
     deps=[title_basics],
+    metadata={"source_file": constants.STATUS_FILE_PATH},
     automation_condition=dg.AutomationCondition.eager(),
 )
 def watch_status(
@@ -163,14 +176,10 @@ def watch_status(
         if len(line.split(",")) != header_cols:
             context.log.warning(f"Line {i} has inconsistent number of columns")
 
-    dtypes = {
-        "tconst": pd.StringDtype(),
-        "watched": pd.BooleanDtype(),
-        "priority": pd.BooleanDtype(),
-        "netflix": pd.BooleanDtype(),
-        "prime": pd.BooleanDtype(),
-    }
-    df = pd.read_csv(constants.STATUS_FILE_PATH, dtype=dtypes, index_col="tconst")
+    dtypes = helpers.arrow_dtypes(constants.STATUS_ARROW_TYPES)
+    df = pd.read_csv(
+        constants.STATUS_FILE_PATH, dtype=dtypes, index_col="tconst", dtype_backend="pyarrow"
+    )
 
     watched = int(df["watched"].value_counts()[True])
     unwatched = int(df["watched"].value_counts()[False])
@@ -180,6 +189,7 @@ def watch_status(
 
     return dg.MaterializeResult(
         value=df,
+        data_version=dg.DataVersion(helpers.file_hash(constants.STATUS_FILE_PATH)),
         metadata={
             "dagster/column_schema": meta_data.schema,
             "first_10_rows": meta_data,
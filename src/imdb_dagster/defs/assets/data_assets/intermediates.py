@@ -1,11 +1,11 @@
 import dagster as dg
 import pandas as pd
+import pyarrow as pa
 
 from .inputs import (
     watched_dates_and_scores,
     watch_status,
     title_basics,
-    title_ratings,
 )
 from .... import helpers
 from .. import constants
@@ -41,13 +41,24 @@ def needed_title_basics(title_basics=title_basics, indices=indices) -> dg.Materi
     missing: pd.Index = indices.difference(title_basics.index)
     present: pd.Index = indices.intersection(title_basics.index)
     df = title_basics.loc[present]
+    # title_basics leaves originalTitle empty where it equals primaryTitle; the
+    # watch list tables and everything built on them show the full value
+    df = df.assign(originalTitle=df["originalTitle"].fillna(df["primaryTitle"]))
 
-    # Expand genres into boolean columns
-    genre_exploded: pd.Series = df["genres"].str.split(",").explode()
+    # Expand genres into boolean columns. genres is dictionary-encoded, so only the
+    # (small) vocabulary of genre combinations is split, not every row.
+    genres: pd.Series = df["genres"].cat.remove_unused_categories()
+    combinations: list = genres.cat.categories.to_list()
+    combination_exploded: pd.Series = (
+        # object dtype keeps .str usable when no title has genres
+        pd.Series(combinations, index=combinations, dtype=object).str.split(",").explode()
+    )
     genre_matrix: pd.DataFrame = (
-        pd.crosstab(genre_exploded.index, genre_exploded)
+        pd.crosstab(combination_exploded.index, combination_exploded)
+        .reindex(genres.astype(object).to_numpy())
+        .set_axis(df.index)
         .add_prefix("genre_")
-        .astype(pd.BooleanDtype())
+        .astype(pd.ArrowDtype(pa.bool_()))
     )
 
     df_final = df.drop(columns="genres").join(genre_matrix)
@@ -68,13 +79,124 @@ def needed_title_basics(title_basics=title_basics, indices=indices) -> dg.Materi
 @dg.asset(
     description="Subset of title_ratings containing only needed indices",
     group_name="intermediates",
-    deps=["title_ratings", "indices"],
+    deps=["title_ratings_array", "indices"],
+    automation_condition=dg.AutomationCondition.eager()
+)
+def needed_title_ratings(title_ratings_array, indices=indices) -> dg.MaterializeResult[pd.DataFrame]:
+    # Gather from the memory-mapped ratings array instead of loading the whole
+    # title_ratings frame for a few thousand rows
+    ratings_array = helpers.open_ratings_array(title_ratings_array)
+    df = helpers.gather_ratings(ratings_array, indices)
+    missing: pd.Index = indices.difference(df.index)
+
+    meta_data: dg.MetadataValue = helpers.get_table_schema(df)
+
+    return dg.MaterializeResult(
+        value=df,
+        metadata={
+            "dagster/column_schema": meta_data.schema,
+            "first_10_rows": meta_data,
+            "total records": dg.MetadataValue.int(len(df)),
+            "not_found": dg.MetadataValue.text(str(missing.to_list())),
+        },
+    )
+
+
+@dg.asset(
+    description="Directors of the needed indices, streamed from title_crew",
+    group_name="intermediates",
+    deps=["title_crew_raw", "indices"],
+    automation_condition=dg.AutomationCondition.eager()
+)
+def needed_title_crew(indices=indices) -> dg.MaterializeResult[pd.DataFrame]:
+    df = helpers.read_filtered_tsv(
+        constants.TITLE_CREW_FILE_PATH,
+        key_column="tconst",
+        keys=indices,
+        usecols=["tconst", "directors"],
+        chunksize=constants.STREAM_CHUNK_SIZE,
+    )
+
+    # One row per (tconst, director)
+    df = (
+        df.dropna(subset=["directors"])
+        .assign(nconst=lambda x: x["directors"].str.split(","))
+        .explode("nconst")
+        .drop(columns="directors")
+        .set_index("tconst")
+    )
+
+    meta_data: dg.MetadataValue = helpers.get_table_schema(df)
+
+    return dg.MaterializeResult(
+        value=df,
+        metadata={
+            "dagster/column_schema": meta_data.schema,
+            "first_10_rows": meta_data,
+            "total records": dg.MetadataValue.int(len(df)),
+        },
+    )
+
+
+@dg.asset(
+    description="Lead actors of the needed indices, streamed from title_principals",
+    group_name="intermediates",
+    deps=["title_principals_raw", "indices"],
+    automation_condition=dg.AutomationCondition.eager()
+)
+def needed_title_principals(indices=indices) -> dg.MaterializeResult[pd.DataFrame]:
+    df = helpers.read_filtered_tsv(
+        constants.TITLE_PRINCIPALS_FILE_PATH,
+        key_column="tconst",
+        keys=indices,
+        usecols=["tconst", "ordering", "nconst", "category"],
+        chunksize=constants.STREAM_CHUNK_SIZE,
+        row_filter=lambda chunk: chunk["category"].isin(["actor", "actress"]),
+    )
+
+    # Keep only the top-billed actors of every title
+    df = (
+        df.sort_values(["tconst", "ordering"])
+        .groupby("tconst")
+        .head(constants.LEAD_ACTOR_COUNT)
+        .set_index("tconst")
+    )
+
+    meta_data: dg.MetadataValue = helpers.get_table_schema(df)
+
+    return dg.MaterializeResult(
+        value=df,
+        metadata={
+            "dagster/column_schema": meta_data.schema,
+            "first_10_rows": meta_data,
+            "total records": dg.MetadataValue.int(len(df)),
+        },
+    )
+
+
+@dg.asset(
+    description="Names of the directors and lead actors of the needed indices",
+    group_name="intermediates",
+    deps=["name_basics_raw", "needed_title_crew", "needed_title_principals"],
     automation_condition=dg.AutomationCondition.eager()
 )
-def needed_title_ratings(title_ratings=title_ratings, indices=indices) -> dg.MaterializeResult[pd.DataFrame]:
-    missing: pd.Index = indices.difference(title_ratings.index)
-    present: pd.Index = indices.intersection(title_ratings.index)
-    df = title_ratings.loc[present]
+def needed_name_basics(
+    needed_title_crew, needed_title_principals
+) -> dg.MaterializeResult[pd.DataFrame]:
+    # Second filtered pass: only the people referenced by the watch list
+    needed_nconst = pd.Index(needed_title_crew["nconst"]).union(
+        pd.Index(needed_title_principals["nconst"])
+    )
+
+    df = helpers.read_filtered_tsv(
+        constants.NAME_BASICS_FILE_PATH,
+        key_column="nconst",
+        keys=needed_nconst,
+        usecols=["nconst", "primaryName"],
+        chunksize=constants.STREAM_CHUNK_SIZE,
+    ).set_index("nconst")
+
+    missing: pd.Index = needed_nconst.difference(df.index)
 
     meta_data: dg.MetadataValue = helpers.get_table_schema(df)
 
@@ -89,20 +211,64 @@ def needed_title_ratings(title_ratings=title_ratings, indices=indices) -> dg.Mat
     )
 
 
+@dg.asset(
+    description="Directors and lead actors per title, as readable names",
+    group_name="intermediates",
+    deps=["needed_title_crew", "needed_title_principals", "needed_name_basics"],
+    automation_condition=dg.AutomationCondition.eager()
+)
+def movie_people(
+    needed_title_crew, needed_title_principals, needed_name_basics
+) -> dg.MaterializeResult[pd.DataFrame]:
+    names: pd.Series = needed_name_basics["primaryName"]
+
+    def join_names(df: pd.DataFrame, column: str) -> pd.Series:
+        return (
+            df["nconst"]
+            .map(names)
+            .dropna()
+            .groupby(level="tconst", sort=False)
+            .agg(", ".join)
+            .rename(column)
+        )
+
+    df = pd.concat(
+        [
+            join_names(needed_title_crew, "directors"),
+            join_names(needed_title_principals, "lead_actors"),
+        ],
+        axis=1,
+    ).astype(pd.ArrowDtype(pa.string()))
+    df.index.name = "tconst"
+
+    meta_data: dg.MetadataValue = helpers.get_table_schema(df)
+
+    return dg.MaterializeResult(
+        value=df,
+        metadata={
+            "dagster/column_schema": meta_data.schema,
+            "first_10_rows": meta_data,
+            "total records": dg.MetadataValue.int(len(df)),
+        },
+    )
+
+
 @dg.asset(
     description="Watch status enriched with IMDb basics and ratings",
     group_name="intermediates",
-    deps=["watch_status", "needed_title_basics", "needed_title_ratings"],
+    deps=["watch_status", "needed_title_basics", "needed_title_ratings", "movie_people"],
     automation_condition=dg.AutomationCondition.eager()
 )
 def my_movie_list(
     watch_status,
     needed_title_basics,
     needed_title_ratings,
+    movie_people,
 ) -> dg.MaterializeResult[pd.DataFrame]:
     df = (
         watch_status.join(needed_title_ratings, how="left")
         .join(needed_title_basics, how="left")
+        .join(movie_people, how="left")
         .sort_values(
             ["watched", "priority", "averageRating"], ascending=[True, False, False]
         )
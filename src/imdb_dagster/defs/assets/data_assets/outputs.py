@@ -1,40 +1,231 @@
 import dagster as dg
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Dict, List
+
 import pandas as pd
 
-from src.imdb_dagster.defs.assets import constants
+from .. import constants
+from .analytics import viewing_history_analytics
 from .intermediates import my_movie_list, my_movie_reviews
-from .... import helpers
+from .... import helpers, query_service
 
 
-@dg.asset(
-    description="Sharabele excel sheet.",
-    group_name="outputs",
-    deps=["my_movie_list", "my_movie_reviews"],
-    automation_condition=dg.AutomationCondition.eager(),
-)
-def watch_list_excel(my_movie_list, my_movie_reviews) -> dg.MaterializeResult:
+def _write_excel(watch_list, my_movie_reviews, viewing_history_analytics) -> None:
     with pd.ExcelWriter(
         constants.PRODUCT_EXCEL_FILE_PATH, engine="xlsxwriter"
     ) as writer:
-        my_movie_list.to_excel(writer, sheet_name="Movie List")
+        watch_list.to_excel(writer, sheet_name="Movie List")
         my_movie_reviews.to_excel(writer, sheet_name="Dates and Reviews")
+        viewing_history_analytics["monthly"].to_excel(writer, sheet_name="Viewing History")
+        viewing_history_analytics["correlation"].to_excel(
+            writer, sheet_name="Rating vs My Scores"
+        )
+
+
+@dg.multi_asset(
+    name="watch_list_documents",
+    specs=[
+        dg.AssetSpec(
+            "watch_list_excel",
+            description="Sharabele excel sheet.",
+            group_name="outputs",
+            deps=["my_movie_list", "my_movie_reviews", "viewing_history_analytics"],
+            automation_condition=dg.AutomationCondition.eager(),
+        ),
+        dg.AssetSpec(
+            "watch_list_figure_html",
+            description="HTML visualisations of unwatched movies.",
+            group_name="outputs",
+            deps=["my_movie_list"],
+            automation_condition=dg.AutomationCondition.eager(),
+        ),
+    ],
+    ins={
+        "my_movie_list": dg.AssetIn("my_movie_list"),
+        "my_movie_reviews": dg.AssetIn("my_movie_reviews"),
+        "viewing_history_analytics": dg.AssetIn("viewing_history_analytics"),
+    },
+    can_subset=True,
+)
+def watch_list_documents(
+    context: dg.AssetExecutionContext, my_movie_list, my_movie_reviews, viewing_history_analytics
+):
+    """
+    Excel sheet and HTML visualisations, written concurrently in one step from one
+    read-only display frame (see helpers.display_watch_list), so the watch list is
+    loaded and converted once for both.
+    """
+    watch_list: pd.DataFrame = helpers.display_watch_list(my_movie_list)
+    writers: Dict[str, tuple] = {
+        "watch_list_excel": (
+            constants.PRODUCT_EXCEL_FILE_PATH,
+            lambda: _write_excel(watch_list, my_movie_reviews, viewing_history_analytics),
+        ),
+        "watch_list_figure_html": (
+            constants.PRODUCT_FIGURE_FILE_PATH,
+            lambda: helpers.create_movie_recommendations(
+                watch_list, constants.PRODUCT_FIGURE_FILE_PATH
+            ),
+        ),
+    }
+    selected: List[str] = [
+        name for name in writers if dg.AssetKey(name) in context.selected_asset_keys
+    ]
+
+    with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        futures = {name: executor.submit(writers[name][1]) for name in selected}
+        for name, future in futures.items():
+            future.result()
+            yield dg.MaterializeResult(
+                asset_key=name,
+                metadata={
+                    "file_path": dg.MetadataValue.path(writers[name][0]),
+                    "display_columns": dg.MetadataValue.int(len(watch_list.columns)),
+                },
+            )
+
+
+@dg.asset(
+    description="HTML report of the viewing-history analytics.",
+    group_name="outputs",
+    deps=["viewing_history_analytics"],
+    automation_condition=dg.AutomationCondition.eager(),
+)
+def viewing_history_html(viewing_history_analytics) -> dg.MaterializeResult:
+    html_path = constants.PRODUCT_HISTORY_HTML_FILE_PATH
+    helpers.write_history_report(viewing_history_analytics, html_path)
 
     return dg.MaterializeResult(
-        # value="",
-        metadata={"file_path": dg.MetadataValue.path(constants.PRODUCT_EXCEL_FILE_PATH)}
+        metadata={"file_path": dg.MetadataValue.path(html_path)}
     )
 
 
 @dg.asset(
-    description="HTML visualisations of unwatched movies.",
+    description="Static site of unwatched movies: an index plus one page per genre and decade.",
     group_name="outputs",
     deps=["my_movie_list"],
     automation_condition=dg.AutomationCondition.eager(),
 )
-def watch_list_figure_html(my_movie_list) -> dg.MaterializeResult:
-    html_path = constants.PRODUCT_FIGURE_FILE_PATH
-    helpers.create_movie_recommendations(my_movie_list, html_path)
+def watch_list_site(my_movie_list) -> dg.MaterializeResult:
+    site_dir = constants.PRODUCT_SITE_DIR_PATH
+    pages: dict = helpers.build_static_site(my_movie_list, site_dir)
 
     return dg.MaterializeResult(
-        metadata={"file_path": dg.MetadataValue.path(html_path)}
+        metadata={
+            "file_path": dg.MetadataValue.path(f"{site_dir}/index.html"),
+            "total_pages": dg.MetadataValue.int(pages["total"]),
+            "rendered_pages": dg.MetadataValue.int(pages["rendered"]),
+            "removed_pages": dg.MetadataValue.int(pages["removed"]),
+        }
+    )
+
+
+@dg.asset(
+    description="Memory-mapped Arrow store of the watch list and reviews for the local query service.",
+    group_name="outputs",
+    deps=["my_movie_list", "my_movie_reviews"],
+    automation_condition=dg.AutomationCondition.eager(),
+)
+def watch_list_query_store(my_movie_list, my_movie_reviews) -> dg.MaterializeResult:
+    store_dir = constants.QUERY_STORE_DIR_PATH
+    os.makedirs(store_dir, exist_ok=True)
+    version: str = query_service.write_store(my_movie_list, my_movie_reviews, store_dir)
+
+    return dg.MaterializeResult(
+        metadata={
+            "file_path": dg.MetadataValue.path(f"{store_dir}/{version}"),
+            "version": dg.MetadataValue.text(version),
+        }
+    )
+
+
+def _connect_sqlite() -> sqlite3.Connection:
+    conn = sqlite3.connect(constants.PRODUCT_SQLITE_FILE_PATH, timeout=60)
+    # WAL lets readers keep querying while an export is written
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@dg.asset(
+    description="Indexed SQLite database of the watch list, its genres and the reviews.",
+    group_name="outputs",
+    deps=["my_movie_list", "my_movie_reviews"],
+    automation_condition=dg.AutomationCondition.eager(),
+)
+def watch_list_sqlite(my_movie_list, my_movie_reviews) -> dg.MaterializeResult:
+    genre_columns = [col for col in my_movie_list.columns if col.startswith("genre_")]
+    with closing(_connect_sqlite()) as conn:
+        counts: dict = {
+            "movie_list": helpers.upsert_sqlite_table(
+                conn,
+                "movie_list",
+                my_movie_list.drop(columns=genre_columns).reset_index(),
+                key_columns=["tconst"],
+                index_columns=["averageRating", "numVotes", "startYear"],
+            ),
+            "movie_genres": helpers.upsert_sqlite_table(
+                conn,
+                "movie_genres",
+                helpers.genre_table(my_movie_list),
+                key_columns=["tconst", "genre"],
+                index_columns=["genre"],
+            ),
+            "movie_reviews": helpers.upsert_sqlite_table(
+                conn,
+                "movie_reviews",
+                helpers.review_table(my_movie_reviews),
+                key_columns=["tconst", "date", "occurrence"],
+                index_columns=["date"],
+            ),
+        }
+
+    return dg.MaterializeResult(
+        metadata={
+            "file_path": dg.MetadataValue.path(constants.PRODUCT_SQLITE_FILE_PATH),
+            **{
+                f"{table}_{count}": dg.MetadataValue.int(value)
+                for table, table_counts in counts.items()
+                for count, value in table_counts.items()
+            },
+        }
+    )
+
+
+@dg.asset(
+    description="Full IMDb ratings/basics catalog in the SQLite database (materialize on demand).",
+    group_name="outputs",
+    deps=["title_basics", "title_ratings"],
+)
+def catalog_sqlite(title_basics, title_ratings) -> dg.MaterializeResult:
+    with closing(_connect_sqlite()) as conn:
+        counts: dict = {
+            "title_ratings": helpers.upsert_sqlite_table(
+                conn,
+                "title_ratings",
+                title_ratings.reset_index(),
+                key_columns=["tconst"],
+                index_columns=["averageRating", "numVotes"],
+            ),
+            "title_basics": helpers.upsert_sqlite_table(
+                conn,
+                "title_basics",
+                title_basics.reset_index(),
+                key_columns=["tconst"],
+                index_columns=["startYear", "genres"],
+            ),
+        }
+
+    return dg.MaterializeResult(
+        metadata={
+            "file_path": dg.MetadataValue.path(constants.PRODUCT_SQLITE_FILE_PATH),
+            **{
+                f"{table}_{count}": dg.MetadataValue.int(value)
+                for table, table_counts in counts.items()
+                for count, value in table_counts.items()
+            },
+        }
     )
@@ -1,78 +1,218 @@
 import dagster as dg
 import os
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Dict, List, Optional
 
-from src.imdb_dagster.defs.assets import constants
+from .. import constants
+from .... import helpers
 
 
-def create_download_asset(
-    name: str,
-    file_path: str,
-    download_url: str,
-    description: str,
-    stale_after_hours: int = 24,
-) -> dg.MaterializeResult:
-    """Factory to create file download assets with staleness checking."""
+@dataclass(frozen=True)
+class Dataset:
+    """One IMDb dataset file fetched by the dataset fetcher.
 
-    @dg.asset(
-        name=name,
-        group_name="raw_inputs",
-        description=description,
-        automation_condition=dg.AutomationCondition.on_cron("* * * * *")
-        & dg.AutomationCondition.on_missing(),  # makes sure it checks every minute if asset exists.
-    )
-    def _asset(context: dg.AssetExecutionContext) -> dg.MaterializeResult:
-        """Download the file only if it's stale or missing."""
-
-        # Check if file exists and is fresh
-        if os.path.exists(file_path):
-            mod_time: float = os.path.getmtime(file_path)
-            current_time: float = time.time()
-            hours_old: float = (current_time - mod_time) / 3600
-
-            if hours_old < stale_after_hours:
-                context.log.info(
-                    f"File {name} is only {hours_old:.1f} hours old, skipping download"
-                )
-                return dg.MaterializeResult(
-                    metadata={
-                        "skipped_download": dg.MetadataValue.bool(True),
-                        "file_age_hours": dg.MetadataValue.float(hours_old),
-                    }
-                )
-
-        # File is stale or missing, download it
-        context.log.info(f"Downloading fresh {name}")
-        response = requests.get(download_url)
-        with open(file_path, "wb") as output_file:
-            output_file.write(response.content)
-
-        return dg.MaterializeResult(
-            metadata={
-                "file_size": dg.MetadataValue.int(len(response.content)),
+    When `parquet_column_types` is given, every new download is also transcoded
+    once into a Parquet copy (see helpers.transcode_to_parquet) that later reads prefer.
+    """
+
+    name: str
+    file_path: str
+    download_url: str
+    description: str
+    stale_after_hours: int = 24
+    parquet_column_types: Optional[Dict[str, str]] = None
+
+
+def refresh_dataset(session, dataset: Dataset, log) -> Dict[str, dg.MetadataValue]:
+    """Download one dataset file if it's stale or missing, then transcode it if needed."""
+    name: str = dataset.name
+    file_path: str = dataset.file_path
+    metadata: Dict[str, dg.MetadataValue] = {}
+
+    # Check if file exists and is fresh
+    hours_old: Optional[float] = None
+    if os.path.exists(file_path):
+        hours_old = (time.time() - os.path.getmtime(file_path)) / 3600
+
+    if hours_old is not None and hours_old < dataset.stale_after_hours:
+        log.info(f"File {name} is only {hours_old:.1f} hours old, skipping download")
+        metadata.update(
+            {
+                "skipped_download": dg.MetadataValue.bool(True),
+                "file_age_hours": dg.MetadataValue.float(hours_old),
+            }
+        )
+    else:
+        # File is stale or missing, stream it to a temporary file and swap it in
+        log.info(f"Downloading fresh {name}")
+        start: float = time.time()
+        tmp_path = f"{file_path}.download"
+        with session.get(
+            dataset.download_url, stream=True, timeout=constants.DOWNLOAD_TIMEOUT_SECONDS
+        ) as response:
+            response.raise_for_status()
+            with open(tmp_path, "wb") as output_file:
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    output_file.write(block)
+        os.replace(tmp_path, file_path)
+
+        metadata.update(
+            {
+                "file_size": dg.MetadataValue.int(os.path.getsize(file_path)),
                 "download_time": dg.MetadataValue.text(datetime.now().isoformat()),
+                "download_seconds": dg.MetadataValue.float(time.time() - start),
                 "skipped_download": dg.MetadataValue.bool(False),
             }
         )
 
-    return _asset
-
-
-# Create your assets using the factory
-title_basics = create_download_asset(
-    name="title_basics_raw",
-    file_path=constants.TITLE_BASICS_FILE_PATH,
-    download_url="https://datasets.imdbws.com/title.basics.tsv.gz",
-    description="Raw IMDB title_basics file",
-    stale_after_hours=23,
-)
-
-title_ratings = create_download_asset(
-    name="title_ratings_raw",
-    file_path=constants.TITLE_RATINGS_FILE_PATH,
-    download_url="https://datasets.imdbws.com/title.ratings.tsv.gz",
-    description="Raw IMDB title_ratings file",
-    stale_after_hours=23,
-)
+    column_types: Optional[Dict[str, str]] = dataset.parquet_column_types
+    if column_types is not None and not helpers.has_fresh_parquet(file_path):
+        log.info(f"Transcoding {name} to Parquet")
+        start = time.time()
+        parquet_size: int = helpers.transcode_to_parquet(file_path, column_types)
+        metadata.update(
+            {
+                "parquet_file_size": dg.MetadataValue.int(parquet_size),
+                "transcode_seconds": dg.MetadataValue.float(time.time() - start),
+            }
+        )
+    return metadata
+
+
+def create_dataset_fetcher(
+    datasets: List[Dataset],
+    max_concurrent_downloads: int = constants.MAX_CONCURRENT_DOWNLOADS,
+) -> dg.AssetsDefinition:
+    """Factory to create one multi-asset that refreshes all dataset files concurrently.
+
+    Every dataset is its own asset. Selected files are refreshed on a bounded thread
+    pool sharing one pooled HTTP session, and each file reports on its own: the files
+    that were refreshed still materialize, but a file that fails to download is not
+    materialized and fails the step, so its downstream assets don't run on the old
+    file. The content hash of a file is its data version.
+    """
+
+    @dg.multi_asset(
+        name="imdb_datasets",
+        specs=[
+            dg.AssetSpec(
+                dataset.name,
+                group_name="raw_inputs",
+                description=dataset.description,
+                metadata={
+                    "source_file": dataset.file_path,
+                    "stale_after_hours": dataset.stale_after_hours,
+                },
+                skippable=True,
+                automation_condition=dg.AutomationCondition.on_cron("* * * * *")
+                & dg.AutomationCondition.on_missing(),  # makes sure it checks every minute if asset exists.
+            )
+            for dataset in datasets
+        ],
+        can_subset=True,
+    )
+    def _fetcher(context: dg.AssetExecutionContext):
+        import requests  # deferred: only needed when the datasets are refreshed
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        selected = [
+            dataset
+            for dataset in datasets
+            if dg.AssetKey(dataset.name) in context.selected_asset_keys
+        ]
+        workers: int = max(1, min(max_concurrent_downloads, len(selected)))
+        failed: Dict[str, str] = {}
+
+        with requests.Session() as session:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=workers,
+                max_retries=Retry(total=3, backoff_factor=2, status_forcelist=[502, 503, 504]),
+            )
+            session.mount("https://", adapter)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(refresh_dataset, session, dataset, context.log): dataset
+                    for dataset in selected
+                }
+                for future in as_completed(futures):
+                    dataset: Dataset = futures[future]
+                    try:
+                        metadata = future.result()
+                    except Exception as exc:
+                        context.log.error(f"Refreshing {dataset.name} failed: {exc}")
+                        failed[dataset.name] = str(exc)
+                        continue
+
+                    yield dg.MaterializeResult(
+                        asset_key=dataset.name,
+                        data_version=dg.DataVersion(helpers.file_hash(dataset.file_path)),
+                        metadata=metadata,
+                    )
+
+        if failed:
+            raise dg.Failure(
+                description=f"Refreshing {sorted(failed)} failed",
+                metadata={name: dg.MetadataValue.text(error) for name, error in failed.items()},
+            )
+
+    return _fetcher
+
+
+# Describe your datasets; the fetcher creates one asset per dataset
+IMDB_DATASETS: List[Dataset] = [
+    Dataset(
+        name="title_basics_raw",
+        file_path=constants.TITLE_BASICS_FILE_PATH,
+        download_url="https://datasets.imdbws.com/title.basics.tsv.gz",
+        description="Raw IMDB title_basics file",
+        stale_after_hours=23,
+        parquet_column_types=constants.TITLE_BASICS_PARQUET_TYPES,
+    ),
+    Dataset(
+        name="title_ratings_raw",
+        file_path=constants.TITLE_RATINGS_FILE_PATH,
+        download_url="https://datasets.imdbws.com/title.ratings.tsv.gz",
+        description="Raw IMDB title_ratings file",
+        stale_after_hours=23,
+        parquet_column_types=constants.TITLE_RATINGS_PARQUET_TYPES,
+    ),
+    Dataset(
+        name="title_principals_raw",
+        file_path=constants.TITLE_PRINCIPALS_FILE_PATH,
+        download_url="https://datasets.imdbws.com/title.principals.tsv.gz",
+        description="Raw IMDB title_principals file",
+        stale_after_hours=23,
+        parquet_column_types=constants.TITLE_PRINCIPALS_PARQUET_TYPES,
+    ),
+    Dataset(
+        name="title_crew_raw",
+        file_path=constants.TITLE_CREW_FILE_PATH,
+        download_url="https://datasets.imdbws.com/title.crew.tsv.gz",
+        description="Raw IMDB title_crew file",
+        stale_after_hours=23,
+        parquet_column_types={},
+    ),
+    Dataset(
+        name="name_basics_raw",
+        file_path=constants.NAME_BASICS_FILE_PATH,
+        download_url="https://datasets.imdbws.com/name.basics.tsv.gz",
+        description="Raw IMDB name_basics file",
+        stale_after_hours=23,
+        parquet_column_types={},
+    ),
+]
+
+imdb_datasets = create_dataset_fetcher(IMDB_DATASETS)
+
+# Keys of the individual dataset assets, for deps and sensor targets
+title_basics = dg.AssetKey("title_basics_raw")
+title_ratings = dg.AssetKey("title_ratings_raw")
+title_principals = dg.AssetKey("title_principals_raw")
+title_crew = dg.AssetKey("title_crew_raw")
+name_basics = dg.AssetKey("name_basics_raw")
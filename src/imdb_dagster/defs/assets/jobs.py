@@ -1,5 +1,9 @@
 import dagster as dg
+from typing import Optional
+
+from . import constants
 from .data_assets import inputs, outputs
+from ... import retention
 
 """
     "D" - only materializes D
@@ -29,4 +33,56 @@ watched_dates_and_scores_job = dg.define_asset_job(
 # runs when watch_status is updated
 watch_status_job = dg.define_asset_job(
     name="watch_status_job", selection=["watch_status*"]
-)
\ No newline at end of file
+)
+
+# runs the union of the sensors' requests, see coalescing.py
+coalesced_refresh_job = dg.define_asset_job(
+    name="coalesced_refresh_job", selection=dg.AssetSelection.all()
+)
+
+
+class RetentionConfig(dg.Config):
+    keep_versions: int = constants.RETENTION_KEEP_VERSIONS
+    max_bytes: Optional[int] = constants.RETENTION_MAX_BYTES
+    dry_run: bool = False
+
+
+@dg.op(description="Delete old run folders, profiles, query store versions and stale files")
+def collect_storage_garbage(context: dg.OpExecutionContext, config: RetentionConfig) -> int:
+    report: dict = retention.collect_garbage(
+        context.instance,
+        context.repository_def.asset_graph,
+        config.keep_versions,
+        config.max_bytes,
+        config.dry_run,
+    )
+    for artifact in report["deleted"]:
+        context.log.info(
+            f"{'Would delete' if config.dry_run else 'Deleted'} {artifact.path} "
+            f"({artifact.size_bytes} bytes, {artifact.delete_reason})"
+        )
+    if report["over_cap_bytes"]:
+        context.log.warning(
+            f"Storage is {report['over_cap_bytes']} bytes over the size cap after "
+            "collection; the remaining artifacts are still needed"
+        )
+
+    context.add_output_metadata(
+        {
+            "bytes_reclaimed": dg.MetadataValue.int(report["bytes_reclaimed"]),
+            "deleted_artifacts": dg.MetadataValue.int(len(report["deleted"])),
+            "over_cap_bytes": dg.MetadataValue.int(report["over_cap_bytes"]),
+            "dry_run": dg.MetadataValue.bool(config.dry_run),
+            **{
+                f"kept_bytes_{store}": dg.MetadataValue.int(size)
+                for store, size in report["kept_bytes"].items()
+            },
+        }
+    )
+    return report["bytes_reclaimed"]
+
+
+# reclaims disk space, see retention.py for the policies
+@dg.job(description="Storage retention: keep the last versions, stay under the size cap")
+def storage_retention_job():
+    collect_storage_garbage()
@@ -0,0 +1,202 @@
+import dagster as dg
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from pydantic import PrivateAttr
+
+from . import constants
+
+# Folder for the dataset cache instead of DATASET_CACHE_DIR_PATH (e.g. /dev/shm/imdb_dagster)
+SHARED_MEMORY_DIR_ENV = "IMDB_DAGSTER_SHARED_MEMORY_DIR"
+# Schema metadata of a cache file: index name and Arrow-backed columns, as JSON
+CACHE_METADATA_KEY = b"imdb_dagster"
+
+
+def dataset_cache_dir() -> str:
+    """Folder of the memory-mapped copies of the cached assets."""
+    return os.environ.get(SHARED_MEMORY_DIR_ENV) or constants.DATASET_CACHE_DIR_PATH
+
+
+def cache_version(instance: dg.DagsterInstance, asset_key: dg.AssetKey) -> Optional[str]:
+    """Version under which the latest materialization of an asset is cached and shared."""
+    record = instance.get_latest_data_version_record(asset_key)
+    if record is None:
+        return None
+    # Computed data versions of these assets only hash upstream versions, which
+    # the raw download assets do not report. The storage id of the
+    # materialization is unique per written value, so key on both.
+    materialization = record.asset_materialization
+    data_version: str = (
+        materialization.tags.get("dagster/data_version", "") if materialization else ""
+    )
+    return f"{record.storage_id}-{data_version[:16]}"
+
+
+def shared_path(shared_memory_dir: str, name: str, version: str) -> str:
+    """Memory-mapped Arrow copy of one version of a cached asset."""
+    return os.path.join(shared_memory_dir, f"{name}-{version}.arrow")
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    return 0
+
+
+class CachingFilesystemIOManager(dg.ConfigurableIOManager):
+    """
+    Filesystem (pickle) IO manager that serves hot, read-only frames from a cache.
+
+    The first load of one of the `cached_assets` after a materialization writes the
+    DataFrame once as an Arrow IPC file in `shared_memory_dir`, named after the
+    version of the latest materialization. Every later load of that version, in any
+    run, step process or asset check, memory-maps the file instead of unpickling:
+    the Arrow-backed columns are attached without copying, only the few NumPy and
+    categorical columns are converted. The folder is kept under `max_bytes` by
+    dropping the least recently used files.
+    """
+
+    base_dir: Optional[str] = None
+    cached_assets: List[str] = ["title_basics", "title_ratings", "indices"]
+    max_bytes: int = 4 * 1024**3
+    shared_memory_dir: Optional[str] = None
+
+    _storage: dg.IOManager = PrivateAttr()
+
+    def setup_for_execution(self, context: dg.InitResourceContext) -> None:
+        # The stock pickle IO manager does the storage, so files stay where
+        # dagster's own FilesystemIOManager puts them
+        self._storage = dg.FilesystemIOManager(
+            base_dir=self.base_dir or context.instance.storage_directory()
+        ).create_io_manager(context)
+
+    def handle_output(self, context: dg.OutputContext, obj: Any) -> None:
+        self._storage.handle_output(context, obj)
+        # Recorded for the dry-run planner's memory estimates
+        if isinstance(obj, (pd.DataFrame, pd.Index)):
+            context.add_output_metadata({"output_memory_bytes": _nbytes(obj)})
+
+    def load_input(self, context: dg.InputContext) -> Any:
+        name: str = context.asset_key.to_python_identifier()
+        if self.shared_memory_dir is None or name not in self.cached_assets:
+            return self._storage.load_input(context)
+
+        version: Optional[str] = self._data_version(context)
+        if version is None:
+            return self._storage.load_input(context)
+
+        value = self._load_shared(name, version)
+        if value is not None:
+            context.log.debug(f"Loaded {name} ({version}) from the dataset cache")
+            return value
+
+        value = self._storage.load_input(context)
+        self._store_shared(name, version, value)
+        return value
+
+    def _data_version(self, context: dg.InputContext) -> Optional[str]:
+        return cache_version(context.instance, context.asset_key)
+
+    def _shared_path(self, name: str, version: str) -> str:
+        return shared_path(self.shared_memory_dir, name, version)
+
+    def _load_shared(self, name: str, version: str) -> Optional[pd.DataFrame]:
+        path = self._shared_path(name, version)
+        if not os.path.exists(path):
+            return None
+
+        import pyarrow as pa
+
+        # The buffers keep the mapping open for as long as the frame lives
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        layout: dict = json.loads(table.schema.metadata[CACHE_METADATA_KEY])
+        # Marks the file as recently used for the size cap
+        os.utime(path)
+
+        columns: Dict[str, Any] = {}
+        for col, array in zip(table.column_names, table.columns):
+            if col in layout["arrow_columns"]:
+                columns[col] = pd.arrays.ArrowExtensionArray(array)
+                continue
+            columns[col] = array.to_pandas().array
+            if col in layout["arrow_categories"]:
+                # Like the genres of title_basics: Arrow-backed categories
+                columns[col] = columns[col].rename_categories(
+                    columns[col].categories.astype(pd.ArrowDtype(array.type.value_type))
+                )
+        index = pd.Index(columns.pop(layout["index_name"]), name=layout["index_name"])
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def _store_shared(self, name: str, version: str, value: Any) -> None:
+        if not isinstance(value, pd.DataFrame):
+            return
+        if value.index.nlevels != 1 or value.index.name is None:
+            return
+        if _nbytes(value) > self.max_bytes:
+            return
+
+        import pyarrow as pa
+
+        os.makedirs(self.shared_memory_dir, exist_ok=True)
+        path = self._shared_path(name, version)
+        # Arrow does not round-trip extension-typed indexes, so store it as a column
+        flat: pd.DataFrame = value.reset_index()
+        table = pa.Table.from_pandas(flat, preserve_index=False)
+        layout: dict = {
+            "index_name": value.index.name,
+            "arrow_columns": [
+                col for col in flat.columns if isinstance(flat[col].dtype, pd.ArrowDtype)
+            ],
+            "arrow_categories": [
+                col
+                for col in flat.columns
+                if isinstance(flat[col].dtype, pd.CategoricalDtype)
+                and isinstance(flat[col].dtype.categories.dtype, pd.ArrowDtype)
+            ],
+        }
+        table = table.replace_schema_metadata({CACHE_METADATA_KEY: json.dumps(layout)})
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        self._evict(name, path)
+
+    def _evict(self, name: str, kept_path: str) -> None:
+        """Drop older versions of the asset, then the least recently used files over the cap."""
+        entries = []
+        for file_name in os.listdir(self.shared_memory_dir):
+            path: str = os.path.join(self.shared_memory_dir, file_name)
+            if not file_name.endswith(".arrow") or path == kept_path:
+                continue
+            try:
+                if file_name.startswith(f"{name}-"):
+                    os.remove(path)
+                else:
+                    entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                # Removed by another process, or still mapped on Windows
+                continue
+
+        total: int = os.path.getsize(kept_path) + sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+
+@dg.definitions
+def resources() -> dg.Definitions:
+    return dg.Definitions(
+        resources={
+            "io_manager": CachingFilesystemIOManager(shared_memory_dir=dataset_cache_dir())
+        }
+    )
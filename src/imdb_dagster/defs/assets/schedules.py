@@ -7,4 +7,11 @@ from . import jobs
 #     name="output_job_schedule",
 #     job=output_job,
 #     cron_schedule="*/15 * * * *",  # Every 15 minutes
-# )
\ No newline at end of file
+# )
+
+# Nightly storage retention, when no downloads or refreshes are expected
+storage_retention_schedule = dg.ScheduleDefinition(
+    name="storage_retention_schedule",
+    job=jobs.storage_retention_job,
+    cron_schedule="30 3 * * *",
+)
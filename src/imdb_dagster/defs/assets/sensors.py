@@ -2,16 +2,15 @@ import dagster as dg
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
-from imdb_dagster.defs.assets.data_assets import inputs
-from src.imdb_dagster.defs.assets import constants
-from . import jobs
+from . import constants, jobs
+from ... import coalescing
 from .data_assets import raw_inputs
 
 
 def file_download_sensor(
-    asset_to_refresh: dg.AssetsDefinition,
+    asset_to_refresh: dg.AssetKey,
     file_path: str,
     sensor_name: str,
     stale_after_hours: int = 24,
@@ -19,7 +18,8 @@ def file_download_sensor(
 ) -> dg.SensorDefinition:
     """Factory to create file freshness sensors for different assets.
 
-    Triggers a run when the file is missing or older than stale_after_hours.
+    Requests a run when the file is missing or older than stale_after_hours; the
+    requests of all freshness sensors are coalesced into one download run.
     """
     path = Path(file_path)
 
@@ -29,6 +29,7 @@ def file_download_sensor(
         minimum_interval_seconds=check_interval_seconds,
         default_status=dg.DefaultSensorStatus.RUNNING,
     )
+    @coalescing.coalesced(sensor_name, [asset_to_refresh])
     def _file_download_sensor(context: dg.SensorEvaluationContext):
         """Check if the file needs to be refreshed."""
         try:
@@ -77,6 +78,30 @@ title_ratings_sensor = file_download_sensor(
     check_interval_seconds=60 * 5,
 )
 
+title_principals_sensor = file_download_sensor(
+    asset_to_refresh=raw_inputs.title_principals,
+    file_path=constants.TITLE_PRINCIPALS_FILE_PATH,
+    sensor_name="title_principals_freshness_sensor",
+    stale_after_hours=24,
+    check_interval_seconds=60 * 5,
+)
+
+title_crew_sensor = file_download_sensor(
+    asset_to_refresh=raw_inputs.title_crew,
+    file_path=constants.TITLE_CREW_FILE_PATH,
+    sensor_name="title_crew_freshness_sensor",
+    stale_after_hours=24,
+    check_interval_seconds=60 * 5,
+)
+
+name_basics_sensor = file_download_sensor(
+    asset_to_refresh=raw_inputs.name_basics,
+    file_path=constants.NAME_BASICS_FILE_PATH,
+    sensor_name="name_basics_freshness_sensor",
+    stale_after_hours=24,
+    check_interval_seconds=60 * 5,
+)
+
 
 def create_file_change_sensor(
     sensor_name: str,
@@ -94,7 +119,8 @@ def create_file_change_sensor(
         minimum_interval_seconds: Minimum seconds between sensor evaluations
 
     Returns:
-        A configured sensor definition that returns either a RunRequest or SkipReason.
+        A configured sensor definition whose run requests are queued for the
+        coalescing sensor (see coalescing.py).
     """
     path = Path(file_path)
 
@@ -104,6 +130,7 @@ def create_file_change_sensor(
         minimum_interval_seconds=minimum_interval_seconds,
         default_status=dg.DefaultSensorStatus.RUNNING,
     )
+    @coalescing.coalesced(sensor_name, job)
     def file_change_sensor(
         context: dg.SensorEvaluationContext,
     ) -> Optional[dg.RunRequest]:
@@ -119,7 +146,10 @@ def create_file_change_sensor(
                         f"Detected change in {path} -> triggering job {job.name}"
                     )
                     context.update_cursor(str(current_mtime))
-                    return dg.RunRequest(run_key=run_key)
+                    return dg.RunRequest(
+                        run_key=run_key,
+                        tags={coalescing.CHANGED_AT_TAG: str(current_mtime)},
+                    )
 
                 context.log.debug(
                     f"No change detected for {path} (mtime {current_mtime})"
@@ -134,7 +164,8 @@ def create_file_change_sensor(
                 )
                 context.update_cursor("0")
                 return dg.RunRequest(
-                    run_key=f"{sensor_name}_missing_{datetime.now().isoformat()}"
+                    run_key=f"{sensor_name}_missing_{datetime.now().isoformat()}",
+                    tags={coalescing.CHANGED_AT_TAG: str(time.time())},
                 )
 
             context.log.debug(
@@ -169,6 +200,7 @@ file_change_sensor_watched_dates_and_scores = create_file_change_sensor(
     name="upstream_sensor_watched_dates_and_scores",
     job=jobs.title_basics_job,
 )
+@coalescing.coalesced("upstream_sensor_watched_dates_and_scores", jobs.title_basics_job)
 def upstream_sensor_watched_dates_and_scores(
     context: dg.SensorEvaluationContext,
 ) -> Optional[dg.RunRequest]:
@@ -199,6 +231,7 @@ def upstream_sensor_watched_dates_and_scores(
     name="upstream_sensor_watch_status",
     job=jobs.title_ratings_job,
 )
+@coalescing.coalesced("upstream_sensor_watch_status", jobs.title_ratings_job)
 def upstream_sensor_watch_status(
     context: dg.SensorEvaluationContext,
 ) -> Optional[dg.RunRequest]:
@@ -223,3 +256,16 @@ def upstream_sensor_watch_status(
         return dg.SkipReason(
             "Upstream assets title_ratings and title_ratings_raw are already materialized"
         )
+
+
+@dg.sensor(
+    name=coalescing.COALESCING_SENSOR_NAME,
+    job=jobs.coalesced_refresh_job,
+    minimum_interval_seconds=constants.COALESCE_WINDOW_SECONDS,
+    default_status=dg.DefaultSensorStatus.RUNNING,
+)
+def coalesced_refresh_sensor(
+    context: dg.SensorEvaluationContext,
+) -> Union[dg.SensorResult, dg.SkipReason]:
+    """Launches one run for the requests the other sensors queued (see coalescing.py)."""
+    return coalescing.coalesce(context)
@@ -1,31 +1,58 @@
-import bokeh.models as models
-import bokeh.plotting as plotting
-import bokeh.layouts as layout
-from bokeh.io import output_file, save
+import gzip
+import os
+import numpy as np
 import pandas as pd
 import dagster as dg
 from dagster import MetadataValue, TableRecord
+from typing import BinaryIO, Callable, Dict, List, Optional
 
 
-def create_movie_recommendations(final_status, filepath) -> None:
+def _display_values(values: pd.Series):
+    """Column values as a NumPy array the writers take as is (None/NaN for missing)."""
+    if pd.api.types.is_float_dtype(values.dtype):
+        return values.to_numpy(dtype="float64", na_value=float("nan"))
+    if values.hasnans:
+        return values.to_numpy(dtype=object, na_value=None)
+    return values.to_numpy()
+
+
+def display_watch_list(movie_list: pd.DataFrame) -> pd.DataFrame:
+    """
+    Project the watch list once onto what the Excel and HTML outputs show.
+
+    Keeps the columns of the "Movie List" sheet and converts the Arrow columns to
+    the NumPy columns both writers take as is. The arrays are read-only, so the
+    writers can share the frame concurrently: writing into it raises instead of
+    changing it for the other.
+
+    Parameters
+    ----------
+    movie_list : pd.DataFrame
+        my_movie_list; it is not modified.
+    """
+    columns: dict = {col: _display_values(movie_list[col]) for col in movie_list.columns}
+    for array in columns.values():
+        array.flags.writeable = False
+
+    return pd.DataFrame(columns, index=movie_list.index.astype(object), copy=False)
+
+
+def create_movie_recommendations(final_status: pd.DataFrame, filepath: str) -> None:
     """
     Generate Bokeh visualizations for unwatched movies and save to HTML.
 
     Parameters
     ----------
     final_status : pd.DataFrame
-        Contains status information of every movie in the watch list.
+        Display frame of the watch list (see display_watch_list); it is not modified.
     filepath : str
         Full path where the HTML file should be saved.
     """
-
-    # Transform priority into a string format
-    final_status.loc[:, "priority"] = (
-        final_status["priority"].astype(pd.BooleanDtype()).map({True: "y", False: "n"})
-    )
-    final_status["url"] = (
-        "https://www.imdb.com/title/" + final_status.index.astype(str) + "/"
-    )
+    # Bokeh is only needed here; importing it lazily keeps definition loading cheap
+    import bokeh.models as models
+    import bokeh.plotting as plotting
+    import bokeh.layouts as layout
+    from bokeh.io import output_file, save
 
     size = (final_status["numVotes"].max() - final_status["numVotes"].min()) / 100
     x_min = final_status["numVotes"].min() - 2 * size
@@ -33,14 +60,22 @@ def create_movie_recommendations(final_status, filepath) -> None:
     y_min = final_status["averageRating"].min()
     y_max = final_status["averageRating"].max()
 
-    source = models.ColumnDataSource(final_status)
+    # The url column is added to the plot data only, not to the shared frame
+    data: dict = models.ColumnDataSource.from_df(final_status)
+    data["url"] = [f"https://www.imdb.com/title/{tconst}/" for tconst in final_status.index]
+    source = models.ColumnDataSource(data)
 
     view_priority = models.CDSView(
-        filter=models.GroupFilter(column_name="priority", group="y")
+        filter=models.BooleanFilter(booleans=final_status["priority"].eq(True).tolist())
     )
     view_all = models.CDSView()
 
-    tooltips = [("Title", "@primaryTitle"), ("Year", "@startYear")]
+    tooltips = [
+        ("Title", "@primaryTitle"),
+        ("Year", "@startYear"),
+        ("Director", "@directors"),
+        ("Starring", "@lead_actors"),
+    ]
 
     def create_figure(title, view, color):
         fig = plotting.figure(
@@ -82,21 +117,10 @@ def create_movie_recommendations(final_status, filepath) -> None:
         ]
     )
 
-    genre_columns = [col for col in final_status.columns if "genre" in col]
-    genres = (
-        final_status[genre_columns]
-        .replace(False, pd.NA)
-        .stack()
-        .reset_index()
-        .drop(columns=[0])
-        .rename(columns={"level_1": "genre"})
-    )
-    genres["genre"] = genres["genre"].str.replace("genre_", "")
-    genres = genres.set_index("tconst")
-
-    display_status = final_status[~final_status["watched"]].drop(columns=genre_columns)
+    genre_columns: List[str] = [col for col in final_status.columns if col.startswith("genre_")]
+    display_status = final_status[final_status["watched"].ne(True)].drop(columns=genre_columns)
     display_status = (
-        display_status.join(genres)
+        display_status.join(genre_table(final_status).set_index("tconst"))
         .groupby("genre")
         .head(10)
         .sort_values(["genre", "averageRating"], ascending=[True, False])
@@ -148,13 +172,884 @@ def create_movie_recommendations(final_status, filepath) -> None:
     save(full_layout)
 
 
+def write_history_report(analytics: Dict[str, pd.DataFrame], filepath: str) -> None:
+    """
+    Save the viewing-history analytics as Bokeh charts in an HTML file.
+
+    Args:
+        analytics: "monthly" and "correlation" frames of viewing_history_analytics.
+        filepath: full path where the HTML file should be saved.
+    """
+    import bokeh.layouts as layout
+    import bokeh.models as models
+    import bokeh.palettes as palettes
+    import bokeh.plotting as plotting
+    from bokeh.io import output_file, save
+
+    monthly: pd.DataFrame = analytics["monthly"].fillna(0).reset_index()
+    source = models.ColumnDataSource(monthly)
+    months: List[str] = monthly["month"].to_list()
+
+    def month_figure(title: str, y_axis_label: str):
+        return plotting.figure(
+            title=title,
+            x_range=months,
+            y_axis_label=y_axis_label,
+            width=1500,
+            height=400,
+            tools="box_zoom,pan,reset,save",
+        )
+
+    fig_watches = month_figure("Watches per Month", "Watches")
+    fig_watches.vbar(x="month", top="watches", width=0.8, source=source)
+
+    fig_scores = month_figure(
+        "Average Scores per Month (rolling average as line)", "Score"
+    )
+    for score, color in [("enjoyment_score", "green"), ("quality_score", "blue")]:
+        fig_scores.scatter(
+            x="month", y=f"avg_{score}", color=color, source=source, legend_label=score
+        )
+        fig_scores.line(
+            x="month", y=f"rolling_avg_{score}", color=color, source=source, legend_label=score
+        )
+
+    share_columns: List[str] = [col for col in monthly.columns if col.startswith("share_")]
+    fig_genres = month_figure("Genre Mix per Month", "Share of watches")
+    if share_columns:
+        fig_genres.vbar_stack(
+            share_columns,
+            x="month",
+            width=0.8,
+            source=source,
+            color=(palettes.Category20[20] * 2)[: len(share_columns)],
+            legend_label=[col[len("share_"):] for col in share_columns],
+        )
+        fig_genres.legend.location = "top_left"
+
+    correlation: pd.DataFrame = analytics["correlation"]
+    pearson_r: pd.Series = correlation["pearson_r"].map(
+        lambda r: "n/a" if pd.isna(r) else f"{r:.2f}"
+    )
+    correlation_rows = "".join(
+        f"<tr><td>{score}</td><td>{reviews}</td><td>{pearson_r[score]}</td></tr>"
+        for score, reviews in correlation["reviews"].items()
+    )
+    header = models.Div(
+        text=f"""<h1 style="text-align: center">Viewing History</h1>
+                <h3>Correlation of the IMDb rating with my scores</h3>
+                <table><tr><th>Score</th><th>Reviews</th><th>Pearson r</th></tr>
+                {correlation_rows}</table>"""
+    )
+
+    output_file(filepath, title="Viewing History")
+    save(layout.column(header, fig_watches, fig_scores, fig_genres))
+
+
+# Bump when the page layout changes so every page of the static site is rebuilt
+SITE_TEMPLATE_VERSION = "1"
+SITE_COLUMNS = [
+    "primaryTitle",
+    "startYear",
+    "averageRating",
+    "numVotes",
+    "priority",
+    "directors",
+    "lead_actors",
+]
+SITE_STYLESHEET = """body { font-family: sans-serif; margin: 2em; }
+h1 { text-align: center; }
+ul.pages { columns: 3; }
+"""
+# Bokeh extends its default file template with this snippet
+SITE_PAGE_TEMPLATE = """{% block preamble %}<link rel="stylesheet" href="{{ stylesheet }}">{% endblock %}
+"""
+
+
+def site_pages(final_status: pd.DataFrame) -> Dict[str, tuple]:
+    """
+    Split the unwatched movies of the watch list into static-site pages.
+
+    Args:
+        final_status: my_movie_list DataFrame (not modified).
+
+    Returns:
+        Mapping of page path (relative to the site root) to (title, rows), with one
+        page per genre and one per decade.
+    """
+    unwatched: pd.DataFrame = final_status[~final_status["watched"].fillna(False)]
+    rows: pd.DataFrame = unwatched[
+        [col for col in SITE_COLUMNS if col in unwatched.columns]
+    ].assign(
+        priority=unwatched["priority"].astype(pd.BooleanDtype()).map({True: "y", False: "n"})
+    )
+    # Stable order, so a change to one movie does not reshuffle ties on other pages
+    rows = rows.sort_index().sort_values(
+        ["averageRating", "numVotes"], ascending=False, kind="stable"
+    )
+
+    pages: Dict[str, tuple] = {}
+    for col in [col for col in unwatched.columns if col.startswith("genre_")]:
+        genre: str = col.removeprefix("genre_")
+        genre_rows = rows[unwatched[col].fillna(False).reindex(rows.index)]
+        if len(genre_rows):
+            pages[f"genre/{genre}.html"] = (f"Unwatched {genre} movies", genre_rows)
+
+    decades: pd.Series = (rows["startYear"] // 10 * 10).astype("Int32")
+    for decade in sorted(decades.dropna().unique()):
+        pages[f"decade/{decade}s.html"] = (
+            f"Unwatched movies from the {decade}s",
+            rows[(decades == decade).fillna(False)],
+        )
+    return pages
+
+
+def page_hash(title: str, rows: pd.DataFrame) -> str:
+    """Content hash of a static-site page, used to skip unchanged pages."""
+    import hashlib
+
+    digest = hashlib.sha256(f"{SITE_TEMPLATE_VERSION}|{title}".encode())
+    digest.update(",".join(rows.columns).encode())
+    digest.update(pd.util.hash_pandas_object(rows, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_site_page(site_dir: str, page: str, title: str, rows: pd.DataFrame) -> str:
+    """
+    Render one static-site page with a rating/votes scatter and a table of movies.
+
+    BokehJS and the stylesheet are referenced from the site's shared static folder
+    instead of being inlined. Runs in a worker process of build_static_site.
+
+    Returns:
+        The page path that was written.
+    """
+    import bokeh.models as models
+    import bokeh.plotting as plotting
+    import bokeh.layouts as layout
+    from bokeh.embed import file_html
+    from bokeh.resources import Resources
+
+    rows = rows.assign(url="https://www.imdb.com/title/" + rows.index.astype(str) + "/")
+    source = models.ColumnDataSource(rows)
+
+    fig = plotting.figure(
+        title=title,
+        x_axis_label="Number of Votes",
+        y_axis_label="Average Rating",
+        x_axis_type="log",
+        width=1200,
+        height=600,
+        tooltips=[("Title", "@primaryTitle"), ("Year", "@startYear")],
+        tools="tap,box_zoom,pan,wheel_zoom,reset,save",
+    )
+    fig.scatter(x="numVotes", y="averageRating", size=8, alpha=0.5, source=source)
+    fig.select_one(models.TapTool).callback = models.OpenURL(url="@url")
+
+    table = models.DataTable(
+        source=source,
+        columns=[
+            models.TableColumn(field=field, title=field)
+            for field in ["tconst", *[col for col in rows.columns if col != "url"]]
+        ],
+        width=1200,
+        height=600,
+    )
+
+    root: str = "../" * page.count("/")
+    header = models.Div(
+        text=f'<h1>{title}</h1><a href="{root}index.html">Back to overview</a>'
+    )
+    html: str = file_html(
+        layout.column(header, fig, table),
+        resources=Resources(mode="server", root_url=root),
+        title=title,
+        template=SITE_PAGE_TEMPLATE,
+        template_variables={"stylesheet": f"{root}static/style.css"},
+    )
+
+    file_path = os.path.join(site_dir, page)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return page
+
+
+def _write_site_static(site_dir: str) -> None:
+    """Copy BokehJS and the stylesheet once into the site's shared static folder."""
+    import shutil
+
+    import bokeh
+    from bokeh.util.paths import bokehjs_path
+
+    js_dir = os.path.join(site_dir, "static", "js")
+    version_file = os.path.join(site_dir, "static", "bokeh_version")
+    copied_version: Optional[str] = None
+    if os.path.exists(version_file):
+        with open(version_file) as f:
+            copied_version = f.read()
+    if copied_version != bokeh.__version__:
+        os.makedirs(js_dir, exist_ok=True)
+        source_dir = os.path.join(bokehjs_path(), "js")
+        for file_name in os.listdir(source_dir):
+            if file_name.endswith(".min.js"):
+                shutil.copy(os.path.join(source_dir, file_name), js_dir)
+        with open(version_file, "w") as f:
+            f.write(bokeh.__version__)
+
+    with open(os.path.join(site_dir, "static", "style.css"), "w") as f:
+        f.write(SITE_STYLESHEET)
+
+
+def _write_site_index(site_dir: str, pages: Dict[str, tuple]) -> None:
+    """Write the overview page linking to every genre and decade page."""
+    from html import escape
+
+    sections = []
+    for section, prefix in [("Genres", "genre/"), ("Decades", "decade/")]:
+        links = "".join(
+            f'<li><a href="{page}">{escape(page.removeprefix(prefix).removesuffix(".html"))}</a>'
+            f" ({len(rows)})</li>"
+            for page, (_, rows) in pages.items()
+            if page.startswith(prefix)
+        )
+        sections.append(f'<h2>{section}</h2><ul class="pages">{links}</ul>')
+
+    with open(os.path.join(site_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(
+            '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+            "<title>Unwatched Movies</title>"
+            '<link rel="stylesheet" href="static/style.css"></head><body>'
+            f"<h1>Unwatched Movies</h1>{''.join(sections)}</body></html>"
+        )
+
+
+def build_static_site(
+    final_status: pd.DataFrame, site_dir: str, max_workers: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Build a multi-page static site of unwatched movies, rendering pages in parallel.
+
+    Writes an index page plus one page per genre and per decade. A manifest of page
+    content hashes is kept in the site folder, so only pages whose rows changed since
+    the last build are rendered again and pages that no longer exist are removed.
+
+    Args:
+        final_status: my_movie_list DataFrame (not modified).
+        site_dir: folder the site is written to.
+        max_workers: size of the process pool; defaults to the number of CPUs.
+
+    Returns:
+        Counts of total, rendered and removed pages.
+    """
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(site_dir, exist_ok=True)
+    manifest_path = os.path.join(site_dir, "manifest.json")
+    previous: Dict[str, str] = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+
+    pages = site_pages(final_status)
+    hashes = {page: page_hash(title, rows) for page, (title, rows) in pages.items()}
+    changed = [
+        page
+        for page in pages
+        if previous.get(page) != hashes[page]
+        or not os.path.exists(os.path.join(site_dir, page))
+    ]
+
+    removed = [page for page in previous if page not in pages]
+    for page in removed:
+        if os.path.exists(os.path.join(site_dir, page)):
+            os.remove(os.path.join(site_dir, page))
+
+    _write_site_static(site_dir)
+    if len(changed) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(
+                pool.map(
+                    render_site_page,
+                    [site_dir] * len(changed),
+                    changed,
+                    [pages[page][0] for page in changed],
+                    [pages[page][1] for page in changed],
+                )
+            )
+    else:
+        for page in changed:
+            render_site_page(site_dir, page, *pages[page])
+
+    _write_site_index(site_dir, pages)
+    with open(manifest_path, "w") as f:
+        json.dump(hashes, f, indent=2)
+
+    return {"total": len(pages), "rendered": len(changed), "removed": len(removed)}
+
+
+def _open_isal(file_path: str, threads: int) -> BinaryIO:
+    from isal import igzip_threaded
+
+    return igzip_threaded.open(file_path, "rb", threads=threads)
+
+
+def _open_zlib_ng(file_path: str, threads: int) -> BinaryIO:
+    from zlib_ng import gzip_ng_threaded
+
+    return gzip_ng_threaded.open(file_path, "rb", threads=threads)
+
+
+def _open_stdlib(file_path: str, threads: int) -> BinaryIO:
+    return gzip.open(file_path, "rb")
+
+
+# Gzip decompression backends in order of preference. The optional ones
+# (python-isal, zlib-ng) are skipped when they are not installed.
+GZIP_BACKENDS: Dict[str, Callable[[str, int], BinaryIO]] = {
+    "isal": _open_isal,
+    "zlib_ng": _open_zlib_ng,
+    "stdlib": _open_stdlib,
+}
+GZIP_BACKEND_ENV = "IMDB_DAGSTER_GZIP_BACKEND"
+
+
+def open_dump(file_path: str, threads: int = 4) -> BinaryIO:
+    """
+    Open a .tsv.gz dump for reading with the fastest available gzip backend.
+
+    The backend can be forced with the IMDB_DAGSTER_GZIP_BACKEND environment
+    variable (one of the keys of GZIP_BACKENDS).
+
+    Args:
+        file_path: path to the gzipped dump.
+        threads: number of worker threads for backends that read in parallel.
+
+    Returns:
+        Binary file object yielding the decompressed bytes.
+    """
+    requested: Optional[str] = os.environ.get(GZIP_BACKEND_ENV)
+    if requested and requested not in GZIP_BACKENDS:
+        raise ValueError(
+            f"Unknown gzip backend {requested!r}, choose from {list(GZIP_BACKENDS)}"
+        )
+
+    for name in [requested] if requested else GZIP_BACKENDS:
+        try:
+            return GZIP_BACKENDS[name](file_path, threads)
+        except ImportError:
+            continue
+    raise ImportError(f"Gzip backend {requested!r} is not installed")
+
+
+def file_hash(file_path: str, block_size: int = 1024 * 1024) -> Optional[str]:
+    """
+    BLAKE2b content hash of a file, or None when the file does not exist.
+
+    The hash is cached in a `<file>.blake2b` sidecar keyed by size and mtime, so
+    the large dumps are only read again after they changed.
+    """
+    import hashlib
+
+    if not os.path.exists(file_path):
+        return None
+
+    stat = os.stat(file_path)
+    stamp = f"{stat.st_size} {stat.st_mtime_ns}"
+    sidecar = f"{file_path}.blake2b"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r") as f:
+            cached_stamp, _, cached_hash = f.read().strip().rpartition(" ")
+        if cached_stamp == stamp:
+            return cached_hash
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    content_hash: str = digest.hexdigest()
+
+    try:
+        with open(sidecar, "w") as f:
+            f.write(f"{stamp} {content_hash}")
+    except OSError:
+        pass  # read-only data folder: the hash is just not cached
+    return content_hash
+
+
+def parquet_path(file_path: str) -> str:
+    """Path of the Parquet copy of a .tsv.gz dump."""
+    return file_path.removesuffix(".tsv.gz") + ".parquet"
+
+
+def has_fresh_parquet(file_path: str) -> bool:
+    """
+    Whether the Parquet copy of a dump exists and is not older than the dump.
+
+    A Parquet copy without its dump (e.g. the dump was removed to save space) is
+    the only copy left, so it counts as fresh.
+    """
+    target = parquet_path(file_path)
+    if not os.path.exists(target):
+        return False
+    if not os.path.exists(file_path):
+        return True
+    return os.path.getmtime(target) >= os.path.getmtime(file_path)
+
+
+def transcode_to_parquet(
+    file_path: str,
+    column_types: Dict[str, str],
+    block_size: int = 32 * 1024 * 1024,
+) -> int:
+    """
+    Transcode a .tsv.gz dump once into a row-grouped, zstd-compressed Parquet file.
+
+    Parquet row groups can be decoded on all cores and skipped using their
+    statistics, which makes every later read much cheaper than inflating the dump.
+
+    Args:
+        file_path: path to the gzipped dump.
+        column_types: pyarrow type aliases (e.g. "int32") for typed columns;
+            all other columns are stored as strings.
+        block_size: bytes of text parsed per batch (one row group per batch).
+
+    Returns:
+        Size of the written Parquet file in bytes.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    with open_dump(file_path) as source:
+        header: List[str] = source.readline().decode("utf-8").rstrip("\n").split("\t")
+
+    types = {col: pa.string() for col in header}
+    types.update({col: pa.type_for_alias(alias) for col, alias in column_types.items()})
+
+    target = parquet_path(file_path)
+    tmp_target = f"{target}.tmp"
+    try:
+        with open_dump(file_path) as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=block_size),
+                parse_options=pa_csv.ParseOptions(delimiter="\t", quote_char=False),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=types, null_values=["\\N"], strings_can_be_null=True
+                ),
+            )
+            with pq.ParquetWriter(tmp_target, reader.schema, compression="zstd") as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+
+        # Swap in atomically so readers never see a half-written file
+        os.replace(tmp_target, target)
+    finally:
+        # Left behind only when the transcode failed
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+    return os.path.getsize(target)
+
+
+def arrow_dtypes(column_types: Dict[str, str]) -> Dict[str, pd.ArrowDtype]:
+    """
+    Arrow-backed pandas dtypes for a mapping of column to pyarrow type alias.
+
+    Args:
+        column_types: column name to alias, e.g. {"numVotes": "int32", "date": "date32"}.
+
+    Returns:
+        Column name to pd.ArrowDtype.
+    """
+    import pyarrow as pa
+
+    return {col: pd.ArrowDtype(pa.type_for_alias(alias)) for col, alias in column_types.items()}
+
+
+def read_dump(
+    file_path: str,
+    index_col: str,
+    dtypes: Dict[str, object],
+    usecols: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load an IMDb dump, preferring its Parquet copy over inflating the .tsv.gz.
+
+    Args:
+        file_path: path to the gzipped dump.
+        index_col: column to use as index.
+        dtypes: dtypes to apply to the loaded columns.
+        usecols: columns to read (including the index column); all when None.
+
+    Returns:
+        DataFrame indexed by `index_col`.
+    """
+    if has_fresh_parquet(file_path):
+        df = pd.read_parquet(
+            parquet_path(file_path), columns=usecols, dtype_backend="pyarrow"
+        ).set_index(index_col)
+        # The Parquet copy is already typed, so this only converts (copies) columns that differ
+        return df.astype(dtypes, copy=False)
+
+    with open_dump(file_path) as source:
+        return pd.read_csv(
+            source,
+            sep="\t",
+            quotechar="\t",
+            low_memory=False,
+            dtype_backend="pyarrow",
+            usecols=usecols,
+            index_col=index_col,
+            dtype=dtypes,
+            na_values="\\N",
+        )
+
+
+def compact_title_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink the string columns of title_basics without materializing Python objects.
+
+    - primaryTitle and originalTitle become Arrow large strings.
+    - originalTitle is only kept where it differs from primaryTitle (NA otherwise);
+      needed_title_basics fills it back in for the watch list.
+    - genres, which repeats a small vocabulary, is dictionary-encoded (categorical)
+      with string categories, also when the column is all NA.
+
+    Args:
+        df: title_basics DataFrame with primaryTitle, originalTitle and genres columns.
+
+    Returns:
+        New DataFrame with the compacted columns.
+    """
+    import pyarrow as pa
+
+    large_string = pd.ArrowDtype(pa.large_string())
+    primary: pd.Series = df["primaryTitle"].astype(large_string)
+    original: pd.Series = df["originalTitle"].astype(large_string)
+    same_title: pd.Series = (original == primary).fillna(False).astype(bool)
+
+    return df.assign(
+        primaryTitle=primary,
+        originalTitle=original.mask(same_title),
+        # An all-NA column is read with the null type, which can't be categorical
+        genres=df["genres"].astype(pd.ArrowDtype(pa.string())).astype("category"),
+    )
+
+
+# Record of the ratings array. Every rated title has votes, so numVotes 0 is the null
+# sentinel of a slot without one; those slots are never written and stay sparse on disk
+RATINGS_ARRAY_DTYPE = np.dtype([("averageRating", "<f4"), ("numVotes", "<i4")])
+VOTES_NULL = 0
+
+
+def tconst_numbers(tconsts) -> np.ndarray:
+    """
+    Numeric part of IMDb title ids ("tt0000001" -> 1), vectorized.
+
+    Returns:
+        int64 array aligned with `tconsts`; -1 for ids that are not "tt<number>".
+    """
+    ids = pd.Series(pd.Index(tconsts).astype(object))
+    numbers = pd.to_numeric(
+        ids.str.slice(2).where(ids.str.startswith("tt")), errors="coerce"
+    )
+    return numbers.fillna(-1).to_numpy(dtype="int64")
+
+
+def write_ratings_array(title_ratings: pd.DataFrame, file_path: str) -> int:
+    """
+    Write title_ratings as a direct-address array file: the record at position n is
+    the rating of title "tt<n>" (see RATINGS_ARRAY_DTYPE; VOTES_NULL elsewhere).
+
+    It is a .npy file, so `open_ratings_array` can memory-map it: looking up one
+    title is one record read and gathering thousands is one vectorized take, without
+    loading the frame.
+
+    Args:
+        title_ratings: DataFrame indexed by tconst with averageRating and numVotes.
+        file_path: target .npy path; written next to it and swapped in atomically.
+
+    Returns:
+        Size of the written file in bytes.
+    """
+    numbers: np.ndarray = tconst_numbers(title_ratings.index)
+    valid: np.ndarray = numbers >= 0
+    slots: int = int(numbers.max()) + 1 if valid.any() else 0
+
+    tmp_path = f"{file_path}.tmp"
+    array = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=RATINGS_ARRAY_DTYPE, shape=(slots,)
+    )
+    array["averageRating"][numbers[valid]] = title_ratings["averageRating"].to_numpy(
+        dtype="float32", na_value=np.nan
+    )[valid]
+    array["numVotes"][numbers[valid]] = title_ratings["numVotes"].to_numpy(
+        dtype="int32", na_value=VOTES_NULL
+    )[valid]
+    array.flush()
+    del array
+
+    # Readers that mapped the previous file keep reading it until they reopen
+    os.replace(tmp_path, file_path)
+    return os.path.getsize(file_path)
+
+
+def open_ratings_array(file_path: str) -> np.ndarray:
+    """Memory-map a ratings array file (read-only); index it with a tconst number."""
+    return np.load(file_path, mmap_mode="r")
+
+
+def gather_ratings(ratings_array: np.ndarray, tconsts) -> pd.DataFrame:
+    """
+    Ratings of many titles from a (memory-mapped) ratings array in one take.
+
+    Args:
+        ratings_array: array returned by open_ratings_array.
+        tconsts: title ids to look up.
+
+    Returns:
+        DataFrame indexed by tconst (in the order of `tconsts`) with the same columns
+        and Arrow dtypes as title_ratings. Like `title_ratings.loc[tconsts.intersection(...)]`,
+        every title appears once (repeated ids are dropped) and titles without a
+        rating are left out.
+    """
+    index = pd.Index(tconsts).unique()
+    numbers: np.ndarray = tconst_numbers(index)
+    in_range: np.ndarray = (numbers >= 0) & (numbers < len(ratings_array))
+    records: np.ndarray = ratings_array[numbers[in_range]]
+    found: np.ndarray = records["numVotes"] != VOTES_NULL
+
+    df = pd.DataFrame(
+        {
+            "averageRating": records["averageRating"][found],
+            "numVotes": records["numVotes"][found],
+        },
+        index=index[in_range][found],
+    )
+    return df.astype(
+        arrow_dtypes({name: RATINGS_ARRAY_DTYPE[name].name for name in RATINGS_ARRAY_DTYPE.names})
+    )
+
+
+def read_filtered_tsv(
+    file_path: str,
+    key_column: str,
+    keys: pd.Index,
+    usecols: List[str],
+    chunksize: int,
+    row_filter: Optional[Callable[[pd.DataFrame], pd.Series]] = None,
+) -> pd.DataFrame:
+    """
+    Stream an IMDb .tsv.gz dump in chunks and keep only rows whose key is in `keys`.
+
+    Only the filtered rows of each chunk are retained, so peak memory is bounded
+    by `chunksize` plus the size of the result instead of the size of the dump.
+    When a fresh Parquet copy exists the key filter is pushed down into it instead,
+    so row groups without matching keys are skipped.
+
+    Args:
+        file_path: path to the IMDb dump.
+        key_column: column that is semi-joined against `keys`.
+        keys: values of `key_column` to keep.
+        usecols: columns to read from the dump.
+        chunksize: number of rows parsed per chunk.
+        row_filter: optional extra mask applied to every (already key-filtered) chunk.
+
+    Returns:
+        DataFrame with the matching rows and a fresh RangeIndex.
+    """
+    if has_fresh_parquet(file_path):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        table = ds.dataset(parquet_path(file_path)).to_table(
+            columns=usecols,
+            filter=ds.field(key_column).isin(pa.array(keys.to_list(), type=pa.string())),
+        )
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        if row_filter is not None:
+            df = df[row_filter(df)]
+        return df.reset_index(drop=True)
+
+    parts = []
+    with open_dump(file_path) as source, pd.read_csv(
+        source,
+        sep="\t",
+        quotechar="\t",
+        dtype_backend="pyarrow",
+        usecols=usecols,
+        na_values="\\N",
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            chunk = chunk[chunk[key_column].isin(keys)]
+            if row_filter is not None:
+                chunk = chunk[row_filter(chunk)]
+            if len(chunk):
+                parts.append(chunk)
+
+    if not parts:
+        return pd.DataFrame(columns=usecols)
+    return pd.concat(parts, ignore_index=True)
+
+
+# Rows per executemany call when writing an SQLite table
+SQLITE_CHUNK_ROWS = 10_000
+
+
+def _sqlite_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def upsert_sqlite_table(
+    conn,
+    table_name: str,
+    df: pd.DataFrame,
+    key_columns: List[str],
+    index_columns: List[str],
+) -> Dict[str, int]:
+    """
+    Incrementally sync a DataFrame into an SQLite table.
+
+    Every row carries a content hash, so only new or changed rows are written and
+    rows that disappeared are deleted. The table (with a primary key on
+    `key_columns` and a secondary index per `index_columns` entry) is recreated
+    when its columns no longer match the DataFrame.
+
+    Args:
+        conn: open sqlite3 connection.
+        table_name: name of the table.
+        df: rows to store; the index is ignored, so reset it first if it is a key.
+        key_columns: primary key columns (must be non-null).
+        index_columns: columns that get a secondary index.
+
+    Returns:
+        Counts of upserted, deleted and total rows.
+    """
+    df = df.reset_index(drop=True)
+    df["row_hash"] = pd.util.hash_pandas_object(df, index=False).to_numpy().view("int64")
+    columns: List[str] = list(df.columns)
+
+    existing_columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+    created: bool = existing_columns != columns
+    if created:
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        column_sql = ", ".join(f'"{col}" {_sqlite_type(df[col].dtype)}' for col in columns)
+        key_sql = ", ".join(f'"{col}"' for col in key_columns)
+        conn.execute(
+            f'CREATE TABLE "{table_name}" ({column_sql}, PRIMARY KEY ({key_sql})) WITHOUT ROWID'
+        )
+
+    # Compare content hashes with what is stored to find the rows to touch
+    stored: pd.DataFrame = pd.read_sql_query(
+        f'SELECT {", ".join(key_columns)}, row_hash FROM "{table_name}"', conn
+    )
+    keys: pd.DataFrame = df[key_columns].astype(str)
+    stored[key_columns] = stored[key_columns].astype(str)
+    merged: pd.DataFrame = keys.assign(row_hash=df["row_hash"]).merge(
+        stored, on=key_columns, how="outer", suffixes=("", "_stored"), indicator=True
+    )
+    changed_keys: pd.DataFrame = merged.loc[
+        (merged["_merge"] == "left_only")
+        | ((merged["_merge"] == "both") & (merged["row_hash"] != merged["row_hash_stored"])),
+        key_columns,
+    ]
+    deleted_keys: pd.DataFrame = merged.loc[merged["_merge"] == "right_only", key_columns]
+
+    changed: pd.DataFrame = df[
+        keys.merge(changed_keys, on=key_columns, how="left", indicator=True)["_merge"]
+        .eq("both")
+        .to_numpy()
+    ]
+    # SQLite only takes plain Python values; None for missing ones. Converting a
+    # column at a time keeps numbers as numbers and everything else as text
+    values: List[np.ndarray] = [
+        (
+            changed[col]
+            if pd.api.types.is_bool_dtype(changed[col].dtype)
+            or pd.api.types.is_numeric_dtype(changed[col].dtype)
+            else changed[col].astype(pd.StringDtype())
+        ).to_numpy(dtype=object, na_value=None)
+        for col in columns
+    ]
+
+    column_sql = ", ".join(f'"{col}"' for col in columns)
+    update_sql = ", ".join(
+        f'"{col}" = excluded."{col}"' for col in columns if col not in key_columns
+    )
+    insert_sql: str = (
+        f'INSERT INTO "{table_name}" ({column_sql}) VALUES ({", ".join("?" * len(columns))}) '
+        f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET {update_sql}'
+    )
+    with conn:
+        for start in range(0, len(changed), SQLITE_CHUNK_ROWS):
+            conn.executemany(
+                insert_sql,
+                zip(*(column[start : start + SQLITE_CHUNK_ROWS] for column in values)),
+            )
+        conn.executemany(
+            f'DELETE FROM "{table_name}" WHERE '
+            + " AND ".join(f'"{col}" = ?' for col in key_columns),
+            deleted_keys.itertuples(index=False, name=None),
+        )
+        # Building secondary indexes once after a bulk load is cheaper than
+        # maintaining them row by row
+        if created:
+            for col in index_columns:
+                conn.execute(
+                    f'CREATE INDEX "ix_{table_name}_{col}" ON "{table_name}" ("{col}")'
+                )
+
+    return {"upserted": len(changed), "deleted": len(deleted_keys), "total": len(df)}
+
+
+def genre_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn the genre_* boolean columns of a watch list into (tconst, genre) rows."""
+    genre_columns = [col for col in df.columns if col.startswith("genre_")]
+    genres: pd.DataFrame = (
+        df[genre_columns]
+        .astype("boolean")
+        .fillna(False)
+        .astype(bool)
+        .rename(columns=lambda col: col.removeprefix("genre_"))
+        .stack()
+    )
+    return (
+        genres[genres]
+        .reset_index()
+        .rename(columns={genres.index.names[1] or "level_1": "genre"})[["tconst", "genre"]]
+    )
+
+
+def review_table(reviews: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn my_movie_reviews into rows keyed by (tconst, date, occurrence).
+
+    A movie can be watched twice on one day and several reviews can be undated,
+    so "occurrence" numbers the reviews sharing a tconst and date. The date is
+    part of the key, so an unknown date is stored as an empty string.
+    """
+    import pyarrow as pa
+
+    rows: pd.DataFrame = reviews.reset_index()
+    rows["date"] = rows["date"].astype(pd.ArrowDtype(pa.string())).fillna("")
+    rows.insert(2, "occurrence", rows.groupby(["tconst", "date"]).cumcount())
+    return rows
+
+
 ALL_VALUES = {
     "tconst": "alphanumeric unique identifier of the title",
     "averageRating": "weighted average of all the individual user ratings",
     "numVotes": "number of votes the title has received",
     "titleType": "type/format of the title (movie, short, tvseries, etc)",
     "primaryTitle": "popular title used on promotional materials",
-    "originalTitle": "original title in the original language",
+    "originalTitle": "original title in the original language (in title_basics, empty when equal to primaryTitle)",
     "isAdult": "0 = non‑adult title, 1 = adult title",
     "startYear": "release year; for TV series, the start year",
     "endYear": "TV series end year; '\\N' for other title types",
@@ -167,6 +1062,19 @@ ALL_VALUES = {
     "date": "date the movie was watched",
     "enjoyment_score": "enjoyment score given after watching. 0=no enjoyment; 1=mweh; 2=fun; 3=good/cool; 4=great",
     "quality_score": "quality score given after watching. 0=bad, don't watch; 1=bad but interesting; 2=good engough; 3=good;4=great",
+    "nconst": "alphanumeric unique identifier of the name/person",
+    "primaryName": "name by which the person is most often credited",
+    "ordering": "number to uniquely identify rows for a given title (billing order)",
+    "category": "category of job that the person was in",
+    "directors": "director(s) of the title",
+    "lead_actors": "top-billed actors/actresses of the title",
+    "function": "profiled function (file:first line)",
+    "self_samples": "profiler samples spent in the function itself",
+    "total_samples": "profiler samples spent in the function including its callees",
+    "self_percent": "share of all profiler samples spent in the function itself",
+    "location": "source line (file:line) holding the traced memory",
+    "size_bytes": "traced memory allocated at the line and still alive",
+    "allocations": "number of live traced allocations at the line",
 }
 
 
@@ -0,0 +1,204 @@
+"""
+Dry-run planner: which assets would re-run, and what would it cost?
+
+Hashes the raw IMDb dumps and the handmade files (every asset with a `source_file`
+in its definition metadata), compares them with the data versions recorded on the
+last materializations and follows the automated downstream assets. Each planned
+asset gets a duration and memory estimate from its recent materializations.
+
+    python -m imdb_dagster.planner
+    python -m imdb_dagster.planner --max-seconds 600 --max-memory-gb 4  # budget gate
+
+Reads the instance in $DAGSTER_HOME; exits with 2 when the plan is over budget.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import dagster as dg
+
+from . import helpers
+
+# Materializations per asset used for the estimates
+HISTORY_RUNS = 10
+# Output metadata holding the in-memory size of a materialized value, by preference
+MEMORY_METADATA_KEYS = ["output_memory_bytes", "memory_bytes"]
+
+
+@dataclass
+class PlannedAsset:
+    asset: str
+    reason: str
+    seconds: Optional[float]
+    memory_bytes: Optional[int]
+
+
+def source_changes(
+    instance: dg.DagsterInstance, asset_graph
+) -> Dict[dg.AssetKey, str]:
+    """
+    Assets reading a source file whose content moved since their last materialization.
+
+    Returns:
+        Dict of asset key to the reason it would run.
+    """
+    changes: Dict[dg.AssetKey, str] = {}
+    for key in asset_graph.toposorted_asset_keys:
+        metadata = asset_graph.get(key).metadata
+        file_path: Optional[str] = metadata.get("source_file")
+        if file_path is None:
+            continue
+
+        record = instance.get_latest_data_version_record(key)
+        materialization = record.asset_materialization if record else None
+        recorded: Optional[str] = (
+            materialization.tags.get("dagster/data_version") if materialization else None
+        )
+        stale_after_hours: Optional[int] = metadata.get("stale_after_hours")
+
+        if not os.path.exists(file_path):
+            changes[key] = f"{file_path} is missing"
+        elif (
+            stale_after_hours is not None
+            and (time.time() - os.path.getmtime(file_path)) / 3600 > stale_after_hours
+        ):
+            changes[key] = f"{file_path} is older than {stale_after_hours}h"
+        elif recorded is None:
+            changes[key] = "never materialized"
+        elif helpers.file_hash(file_path) != recorded:
+            changes[key] = f"{file_path} changed"
+    return changes
+
+
+def estimate(
+    instance: dg.DagsterInstance, key: dg.AssetKey, history: int = HISTORY_RUNS
+) -> tuple:
+    """
+    Median step duration and largest recorded in-memory size over recent materializations.
+
+    Returns:
+        (seconds, memory_bytes); either is None without history.
+    """
+    durations: List[float] = []
+    memory: List[int] = []
+    for record in instance.fetch_materializations(key, limit=history).records:
+        entry = record.event_log_entry
+        for stats in instance.get_run_step_stats(entry.run_id, step_keys=[entry.step_key]):
+            if stats.start_time is not None and stats.end_time is not None:
+                durations.append(stats.end_time - stats.start_time)
+
+        metadata = record.asset_materialization.metadata
+        for metadata_key in MEMORY_METADATA_KEYS:
+            if metadata_key in metadata:
+                memory.append(int(metadata[metadata_key].value))
+                break
+
+    return (
+        statistics.median(durations) if durations else None,
+        max(memory) if memory else None,
+    )
+
+
+def plan(
+    instance: dg.DagsterInstance, definitions: dg.Definitions, history: int = HISTORY_RUNS
+) -> List[PlannedAsset]:
+    """
+    Assets that would materialize next, in dependency order, with cost estimates.
+
+    Starts from the assets whose source files changed and from automated assets
+    that were never materialized, then follows every automated downstream asset.
+    """
+    asset_graph = definitions.resolve_asset_graph()
+    reasons: Dict[dg.AssetKey, str] = source_changes(instance, asset_graph)
+
+    for key in asset_graph.toposorted_asset_keys:
+        node = asset_graph.get(key)
+        if key not in reasons and node.automation_condition is not None:
+            if instance.get_latest_materialization_event(key) is None:
+                reasons[key] = "never materialized"
+
+        for child_key in node.child_keys:
+            child = asset_graph.get(child_key)
+            if key in reasons and child.automation_condition is not None:
+                reasons.setdefault(child_key, f"upstream {key.to_user_string()}")
+
+    planned: List[PlannedAsset] = []
+    for key in asset_graph.toposorted_asset_keys:
+        if key in reasons:
+            seconds, memory_bytes = estimate(instance, key, history)
+            planned.append(
+                PlannedAsset(key.to_user_string(), reasons[key], seconds, memory_bytes)
+            )
+    return planned
+
+
+def check_budget(
+    planned: List[PlannedAsset],
+    max_seconds: Optional[float] = None,
+    max_memory_bytes: Optional[int] = None,
+) -> List[str]:
+    """
+    Compare a plan against a budget.
+
+    Steps run one after the other in the worst case, so durations add up; memory is
+    compared per asset, as every step holds its own value.
+
+    Returns:
+        Human readable budget violations; empty when within budget.
+    """
+    violations = []
+    total_seconds: float = sum(p.seconds or 0.0 for p in planned)
+    if max_seconds is not None and total_seconds > max_seconds:
+        violations.append(f"estimated {total_seconds:.0f}s (> {max_seconds:.0f}s)")
+    for p in planned:
+        if max_memory_bytes is not None and (p.memory_bytes or 0) > max_memory_bytes:
+            violations.append(
+                f"{p.asset} estimated at {p.memory_bytes / 1024**2:.1f} MiB "
+                f"(> {max_memory_bytes / 1024**2:.1f} MiB)"
+            )
+    unknown = [p.asset for p in planned if p.seconds is None]
+    if unknown and max_seconds is not None:
+        violations.append(f"no duration history for {unknown}")
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--max-memory-gb", type=float, default=None)
+    parser.add_argument("--history", type=int, default=HISTORY_RUNS)
+    args = parser.parse_args(argv)
+
+    from .definitions import defs
+
+    with dg.DagsterInstance.get() as instance:
+        planned: List[PlannedAsset] = plan(instance, defs(), args.history)
+
+    if not planned:
+        print("Nothing would materialize")
+        return 0
+
+    name_width = max(len(p.asset) for p in planned)
+    print(f"{'asset':<{name_width}}  {'est. s':>8}  {'est. MiB':>9}  reason")
+    for p in planned:
+        seconds = f"{p.seconds:.1f}" if p.seconds is not None else "?"
+        memory = f"{p.memory_bytes / 1024**2:.1f}" if p.memory_bytes is not None else "?"
+        print(f"{p.asset:<{name_width}}  {seconds:>8}  {memory:>9}  {p.reason}")
+    print(f"{len(planned)} assets, about {sum(p.seconds or 0.0 for p in planned):.0f}s")
+
+    max_memory_bytes = (
+        int(args.max_memory_gb * 1024**3) if args.max_memory_gb is not None else None
+    )
+    problems = check_budget(planned, args.max_seconds, max_memory_bytes)
+    for problem in problems:
+        print(f"  over budget: {problem}")
+    return 2 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Opt-in sampling profiler for asset and check execution.
+
+`profile_definitions` wraps every asset and asset check in `profiled` when the
+definitions are built (see definitions.py), so asset modules need no decorator and
+no asset can be left out. Profiling is off unless the run has the `imdb_dagster/profile` tag or the
+IMDB_DAGSTER_PROFILE environment variable set to:
+
+- "cpu": sample the Python stack of the step every few milliseconds
+- "memory": additionally trace allocations with tracemalloc (slows the step down)
+- "audit": "memory" plus a copy audit, meant for test runs: bytes allocated by
+  NumPy/Python and by Arrow's memory pool, and which output columns reuse the
+  buffers of the inputs, which were copied and which are not Arrow-backed
+
+The samples are written as collapsed stacks (open them in speedscope.app or
+flamegraph.pl) next to the run id, linked from the result metadata together with
+tables of the hottest functions and, with "memory", the largest allocation sites.
+`audit_report` collects the audit of every asset of an in-process run in one table.
+"""
+
+import bisect
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import dagster as dg
+import numpy as np
+import pandas as pd
+
+from . import helpers
+from .defs.assets import constants
+
+PROFILE_TAG = "imdb_dagster/profile"
+PROFILE_ENV = "IMDB_DAGSTER_PROFILE"
+PROFILE_MODES = {"cpu", "memory", "audit"}
+SAMPLE_INTERVAL_SECONDS = 0.005
+# Rows in the hot-function and allocation tables
+TOP_N = 15
+# Set on the functions returned by `profiled`, so a function is never wrapped twice
+PROFILED_ATTRIBUTE = "_imdb_dagster_profiled"
+
+
+class SamplingProfiler:
+    """Samples the Python stack of one thread from a background thread."""
+
+    def __init__(
+        self,
+        thread_id: int,
+        root_code,
+        interval: float = SAMPLE_INTERVAL_SECONDS,
+        arrow_pool=None,
+    ):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        # Arrow allocates outside tracemalloc, so its pool is polled for the peak instead
+        self.arrow_pool = arrow_pool
+        self.arrow_peak_bytes: int = arrow_pool.bytes_allocated() if arrow_pool else 0
+        # Only stacks inside this code object are kept; Dagster's machinery above it
+        # and the profiler's own bookkeeping are left out
+        self._root_code = root_code
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.arrow_pool is not None:
+                self.arrow_peak_bytes = max(
+                    self.arrow_peak_bytes, self.arrow_pool.bytes_allocated()
+                )
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                if code is self._root_code:
+                    self.samples[tuple(reversed(stack))] += 1
+                    break
+                frame = frame.f_back
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format: `root;caller;leaf count` per line."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def hot_functions(self, top_n: int = TOP_N) -> pd.DataFrame:
+        """Functions by samples spent in the function itself, and including callees."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+
+        samples: int = max(sum(self.samples.values()), 1)
+        return pd.DataFrame(
+            [
+                {
+                    "function": function,
+                    "self_samples": count,
+                    "total_samples": total[function],
+                    "self_percent": round(100 * count / samples, 1),
+                }
+                for function, count in own.most_common(top_n)
+            ],
+            columns=["function", "self_samples", "total_samples", "self_percent"],
+        )
+
+
+def allocation_sites(snapshot: tracemalloc.Snapshot, top_n: int = TOP_N) -> pd.DataFrame:
+    """Source lines holding the most traced memory at the end of the step."""
+    return pd.DataFrame(
+        [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "allocations": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:top_n]
+        ],
+        columns=["location", "size_bytes", "allocations"],
+    )
+
+
+def profile_mode(context) -> Optional[str]:
+    """The profiling mode requested for this run (tag first, then environment)."""
+    mode: str = context.run.tags.get(PROFILE_TAG) or os.environ.get(PROFILE_ENV, "")
+    return mode.lower() if mode.lower() in PROFILE_MODES else None
+
+
+def _artifact_path(context, suffix: str) -> str:
+    folder = os.path.join(constants.PROFILE_DIR_PATH, context.run_id)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{context.op.name}{suffix}")
+
+
+def _profile_metadata(
+    context, profiler: SamplingProfiler, seconds: float, snapshot, peak_bytes: int
+) -> Dict[str, dg.MetadataValue]:
+    collapsed_path: str = _artifact_path(context, ".collapsed")
+    with open(collapsed_path, "w") as f:
+        f.write(profiler.collapsed())
+
+    hot: dg.MetadataValue = helpers.get_table_schema(profiler.hot_functions(), max_preview=TOP_N)
+    metadata: Dict[str, dg.MetadataValue] = {
+        "profile_collapsed_stacks": dg.MetadataValue.path(collapsed_path),
+        "profile_samples": dg.MetadataValue.int(sum(profiler.samples.values())),
+        "profile_seconds": dg.MetadataValue.float(seconds),
+        "profile_hot_functions": hot,
+    }
+
+    if snapshot is not None:
+        memory_path: str = _artifact_path(context, ".memory.txt")
+        with open(memory_path, "w") as f:
+            f.writelines(f"{stat}\n" for stat in snapshot.statistics("lineno")[:100])
+        metadata.update(
+            {
+                "profile_memory_sites": dg.MetadataValue.path(memory_path),
+                "profile_peak_traced_bytes": dg.MetadataValue.int(peak_bytes),
+                "profile_top_allocations": helpers.get_table_schema(
+                    allocation_sites(snapshot), max_preview=TOP_N
+                ),
+            }
+        )
+    return metadata
+
+
+def _array_buffers(array) -> List[Tuple[int, int]]:
+    """(address, size) of the memory behind one column."""
+    if isinstance(array, pd.arrays.ArrowExtensionArray):
+        return [
+            (buffer.address, buffer.size)
+            for chunk in array.__arrow_array__().chunks
+            for buffer in chunk.buffers()
+            if buffer is not None and buffer.size
+        ]
+    if isinstance(array, pd.Categorical):
+        array = array.codes
+    values: np.ndarray = np.asarray(array)
+    return [(values.__array_interface__["data"][0], values.nbytes)] if values.nbytes else []
+
+
+def _columns(value) -> Dict[str, object]:
+    """The arrays (index included) of a DataFrame, an Index or a dict of DataFrames."""
+    if isinstance(value, dict):
+        return {
+            f"{key}.{column}": array
+            for key, frame in value.items()
+            for column, array in _columns(frame).items()
+        }
+    if isinstance(value, pd.Index):
+        return {str(value.name or "index"): value.array}
+    if not isinstance(value, pd.DataFrame):
+        return {}
+    columns: Dict[str, object] = {str(value.index.name or "index"): value.index.array}
+    columns.update({str(col): value.iloc[:, i].array for i, col in enumerate(value.columns)})
+    return columns
+
+
+def copy_audit(inputs: List, output) -> Dict[str, dg.MetadataValue]:
+    """
+    Which columns of `output` reuse the memory of `inputs` and which were copied.
+
+    A column is shared when all of its buffers lie inside buffers of the inputs
+    (e.g. a slice); a take, cast or join result has buffers of its own.
+
+    Returns:
+        Audit metadata; empty when the output is not a DataFrame, Index or dict of them.
+    """
+    columns: Dict[str, object] = _columns(output)
+    if not columns:
+        return {}
+
+    # Merged, sorted [start, end) ranges of all input memory
+    ranges: List[List[int]] = []
+    for start, size in sorted(
+        buffer for value in inputs for array in _columns(value).values()
+        for buffer in _array_buffers(array)
+    ):
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], start + size)
+        else:
+            ranges.append([start, start + size])
+    starts: List[int] = [start for start, _ in ranges]
+
+    def inside_inputs(address: int, size: int) -> bool:
+        i: int = bisect.bisect_right(starts, address) - 1
+        return i >= 0 and address + size <= ranges[i][1]
+
+    shared: List[str] = []
+    copied: List[str] = []
+    output_bytes: int = 0
+    copied_bytes: int = 0
+    for name, array in columns.items():
+        buffers = _array_buffers(array)
+        own: int = sum(size for address, size in buffers if not inside_inputs(address, size))
+        output_bytes += sum(size for _, size in buffers)
+        copied_bytes += own
+        (copied if own else shared).append(name)
+
+    return {
+        "audit_output_bytes": dg.MetadataValue.int(output_bytes),
+        "audit_copied_bytes": dg.MetadataValue.int(copied_bytes),
+        "audit_copied_columns": dg.MetadataValue.text(", ".join(copied)),
+        "audit_shared_columns": dg.MetadataValue.text(", ".join(shared)),
+        "audit_non_arrow_columns": dg.MetadataValue.text(
+            ", ".join(
+                name
+                for name, array in columns.items()
+                if not isinstance(array, pd.arrays.ArrowExtensionArray)
+            )
+        ),
+    }
+
+
+def audit_report(run_result) -> pd.DataFrame:
+    """
+    Bytes allocated and copied per asset of an in-process run made in "audit" mode.
+
+    Args:
+        run_result: result of `execute_in_process` or `dg.materialize`.
+
+    Returns:
+        One row per materialized asset with its audit_* metadata (prefix dropped).
+    """
+    rows: List[dict] = []
+    for event in run_result.get_asset_materialization_events():
+        metadata = event.materialization.metadata
+        if "audit_allocated_bytes" in metadata:
+            rows.append(
+                {
+                    "asset": event.asset_key.to_user_string(),
+                    **{
+                        key.removeprefix("audit_"): value.value
+                        for key, value in metadata.items()
+                        if key.startswith("audit_")
+                    },
+                }
+            )
+    return pd.DataFrame(rows).set_index("asset") if rows else pd.DataFrame()
+
+
+def _with_metadata(result, metadata: Dict[str, dg.MetadataValue]):
+    if isinstance(result, (dg.MaterializeResult, dg.AssetCheckResult)):
+        return result._replace(metadata={**(result.metadata or {}), **metadata})
+    return result
+
+
+def _audit(mode: str, inputs: List, result) -> Dict[str, dg.MetadataValue]:
+    if mode != "audit":
+        return {}
+    value = result.value if isinstance(result, dg.MaterializeResult) else result
+    return copy_audit(inputs, value)
+
+
+def _profile_call(context, mode: str, fn: Callable, call: Callable) -> tuple:
+    """Run `call` (which executes `fn`) under the profiler; returns (result, metadata)."""
+    context.log.info(f"Profiling {context.op.name} ({mode})")
+    arrow_pool = None
+    if mode in ("memory", "audit"):
+        tracemalloc.start()
+    if mode == "audit":
+        import pyarrow as pa
+
+        arrow_pool = pa.default_memory_pool()
+    arrow_start: int = arrow_pool.bytes_allocated() if arrow_pool is not None else 0
+
+    start: float = time.perf_counter()
+    try:
+        with SamplingProfiler(
+            threading.get_ident(), fn.__code__, arrow_pool=arrow_pool
+        ) as profiler:
+            result = call()
+    finally:
+        seconds: float = time.perf_counter() - start
+        snapshot: Optional[tracemalloc.Snapshot] = None
+        peak_bytes: int = 0
+        if mode in ("memory", "audit"):
+            snapshot = tracemalloc.take_snapshot()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    metadata = _profile_metadata(context, profiler, seconds, snapshot, peak_bytes)
+    if arrow_pool is not None:
+        # Peak at the sampling resolution; short-lived Arrow buffers may be missed
+        arrow_peak: int = max(profiler.arrow_peak_bytes, arrow_pool.bytes_allocated())
+        metadata.update(
+            {
+                "audit_python_peak_bytes": dg.MetadataValue.int(peak_bytes),
+                "audit_arrow_peak_bytes": dg.MetadataValue.int(arrow_peak - arrow_start),
+                "audit_allocated_bytes": dg.MetadataValue.int(
+                    peak_bytes + arrow_peak - arrow_start
+                ),
+            }
+        )
+    return result, metadata
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Wrap an asset or check function in the opt-in profiler.
+
+    Keeps the signature of `fn`, so Dagster still matches inputs by parameter name.
+    The profile is added to the metadata of the returned MaterializeResult or
+    AssetCheckResult, or of every result yielded by a generator function.
+    """
+
+    def requested_mode():
+        context = dg.OpExecutionContext.get()
+        return context, profile_mode(context) if context is not None else None
+
+    if inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            context, mode = requested_mode()
+            if mode is None:
+                yield from fn(*args, **kwargs)
+                return
+
+            # Buffered, so that every result can link to the profile of the whole step
+            results, metadata = _profile_call(
+                context, mode, fn, lambda: list(fn(*args, **kwargs))
+            )
+            for result in results:
+                yield _with_metadata(
+                    result, {**metadata, **_audit(mode, [*args, *kwargs.values()], result)}
+                )
+
+        setattr(generator_wrapper, PROFILED_ATTRIBUTE, True)
+        return generator_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        context, mode = requested_mode()
+        if mode is None:
+            return fn(*args, **kwargs)
+
+        result, metadata = _profile_call(context, mode, fn, lambda: fn(*args, **kwargs))
+        metadata.update(_audit(mode, [*args, *kwargs.values()], result))
+        if isinstance(result, (dg.MaterializeResult, dg.AssetCheckResult)):
+            return _with_metadata(result, metadata)
+        context.add_output_metadata(metadata)
+        return result
+
+    setattr(wrapper, PROFILED_ATTRIBUTE, True)
+    return wrapper
+
+
+def profile_definitions(defs: dg.Definitions) -> dg.Definitions:
+    """
+    Wrap the function of every asset and asset check of `defs` in `profiled`.
+
+    The ops are updated in place, so subsets of the assets (jobs, selections) that
+    share them are profiled too. Functions already wrapped are left as they are.
+    """
+    # Dagster has no public way to wrap the compute function of a built op
+    from dagster._core.definitions.decorators.op_decorator import DecoratedOpFunction
+
+    for definition in [*(defs.assets or []), *(defs.asset_checks or [])]:
+        if not isinstance(definition, dg.AssetsDefinition) or not definition.is_executable:
+            continue
+        for op_def in definition.node_def.iterate_op_defs():
+            compute_fn = op_def.compute_fn
+            if isinstance(compute_fn, DecoratedOpFunction) and not getattr(
+                compute_fn.decorated_fn, PROFILED_ATTRIBUTE, False
+            ):
+                op_def._compute_fn = compute_fn._replace(
+                    decorated_fn=profiled(compute_fn.decorated_fn)
+                )
+    return defs
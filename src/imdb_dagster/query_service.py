@@ -0,0 +1,373 @@
+"""
+Low-latency local query service over the materialized watch list.
+
+The `watch_list_query_store` asset writes `my_movie_list` and `my_movie_reviews`
+as memory-mappable Arrow IPC files into a new version folder of the store and then
+atomically repoints the store's CURRENT file at it. The service memory-maps the
+current version, answers filters with precomputed sort orders and boolean columns,
+and switches to a new version as soon as CURRENT changes. Pandas is never imported
+on the request path.
+
+Serve over HTTP:
+
+    python -m imdb_dagster.query_service serve --port 8765
+    curl "localhost:8765/movies?genre=Drama&unwatched=1&min_rating=7"
+
+Or query once from the command line:
+
+    python -m imdb_dagster.query_service movies --genre Drama --unwatched --min-rating 7
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pyarrow as pa
+
+MOVIES_FILE = "movies.arrow"
+REVIEWS_FILE = "reviews.arrow"
+CURRENT_FILE = "CURRENT"
+# Permutation of the movie rows sorted by numVotes (descending, nulls last)
+BY_VOTES_COLUMN = "_by_votes"
+# Store versions kept on disk, so readers of the previous version can finish
+KEEP_VERSIONS = 2
+
+
+class StoreNotBuiltError(RuntimeError):
+    """The query store has no current version yet."""
+
+
+def write_store(movie_list, movie_reviews, store_dir: str) -> str:
+    """
+    Write a new version of the query store and atomically make it current.
+
+    Movies are stored sorted by averageRating (descending, nulls last), so a rating
+    threshold is a prefix of the rows; the order by numVotes is stored as a
+    permutation column.
+
+    Args:
+        movie_list: my_movie_list DataFrame indexed by tconst.
+        movie_reviews: my_movie_reviews DataFrame indexed by tconst.
+        store_dir: folder of the query store.
+
+    Returns:
+        Name of the version folder that was made current.
+    """
+    import pandas as pd
+
+    movies: pd.DataFrame = (
+        movie_list.reset_index()
+        .sort_values(["averageRating", "tconst"], ascending=[False, True], na_position="last")
+        .reset_index(drop=True)
+    )
+    movies[BY_VOTES_COLUMN] = (
+        movies["numVotes"]
+        .sort_values(ascending=False, na_position="last", kind="stable")
+        .index.to_numpy(dtype="int32")
+    )
+
+    version: str = time.strftime("%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+    version_dir = os.path.join(store_dir, version)
+    os.makedirs(version_dir)
+    reviews: pd.DataFrame = movie_reviews.reset_index().sort_values(
+        "date", ascending=False, na_position="last", kind="stable"
+    )
+    for frame, file_name in [(movies, MOVIES_FILE), (reviews, REVIEWS_FILE)]:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.OSFile(os.path.join(version_dir, file_name), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    # Repointing CURRENT is the atomic switch readers observe
+    tmp_current = os.path.join(store_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp_current, "w") as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(store_dir, CURRENT_FILE))
+
+    versions = sorted(
+        name for name in os.listdir(store_dir) if os.path.isdir(os.path.join(store_dir, name))
+    )
+    for old_version in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(store_dir, old_version), ignore_errors=True)
+
+    return version
+
+
+# NumPy dtypes of the Arrow types read on the request path. Conversions go through
+# raw buffers, because pyarrow's own conversions import pandas.
+_NUMPY_DTYPES = {"float": np.float32, "double": np.float64, "int32": np.int32, "int64": np.int64}
+
+
+def _unpack_bits(buffer: pa.Buffer, offset: int, length: int) -> np.ndarray:
+    bits = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8), bitorder="little")
+    return bits[offset : offset + length].astype(bool)
+
+
+def _valid(array: pa.Array) -> np.ndarray:
+    validity: Optional[pa.Buffer] = array.buffers()[0]
+    if validity is None:
+        return np.ones(len(array), dtype=bool)
+    return _unpack_bits(validity, array.offset, len(array))
+
+
+def _bool_mask(table: pa.Table, column: str) -> np.ndarray:
+    """Boolean column as a NumPy array with nulls treated as False."""
+    array: pa.Array = table.column(column).combine_chunks()
+    return _unpack_bits(array.buffers()[1], array.offset, len(array)) & _valid(array)
+
+
+def _numeric(table: pa.Table, column: str, null_value: float) -> np.ndarray:
+    """Numeric column as a NumPy array with nulls replaced by `null_value`."""
+    array: pa.Array = table.column(column).combine_chunks()
+    values = np.frombuffer(array.buffers()[1], dtype=_NUMPY_DTYPES[str(array.type)])
+    values = values[array.offset : array.offset + len(array)]
+    return np.where(_valid(array), values, null_value)
+
+
+class _Snapshot:
+    """One memory-mapped version of the store with its precomputed filters."""
+
+    def __init__(self, version_dir: str) -> None:
+        self.movies: pa.Table = self._map(os.path.join(version_dir, MOVIES_FILE))
+        self.reviews: pa.Table = self._map(os.path.join(version_dir, REVIEWS_FILE))
+
+        self.ratings: np.ndarray = _numeric(self.movies, "averageRating", -1.0)
+        self.by_votes: np.ndarray = _numeric(self.movies, BY_VOTES_COLUMN, -1).astype(np.int64)
+        self.votes_sorted: np.ndarray = _numeric(self.movies, "numVotes", -1)[self.by_votes]
+        self.masks: Dict[str, np.ndarray] = {
+            name: _bool_mask(self.movies, name)
+            for name in self.movies.column_names
+            if name in ("watched", "priority", "netflix", "prime")
+            or name.startswith("genre_")
+        }
+        self.result_columns: List[str] = [
+            name
+            for name in self.movies.column_names
+            if name != BY_VOTES_COLUMN and not name.startswith("genre_")
+        ]
+
+    @staticmethod
+    def _map(path: str) -> pa.Table:
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+class WatchListStore:
+    """Reader of the query store that follows its CURRENT version."""
+
+    def __init__(self, store_dir: str) -> None:
+        self.store_dir = store_dir
+        self._current_path = os.path.join(store_dir, CURRENT_FILE)
+        self._lock = threading.Lock()
+        self._stamp: Optional[int] = None
+        self._snapshot: Optional[_Snapshot] = None
+
+    def snapshot(self) -> _Snapshot:
+        """The current version, reloaded only when CURRENT has been replaced."""
+        try:
+            stamp: int = os.stat(self._current_path).st_mtime_ns
+        except FileNotFoundError:
+            raise StoreNotBuiltError(
+                f"No query store in {self.store_dir} yet, materialize watch_list_query_store first"
+            ) from None
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(self._current_path) as f:
+                        version: str = f.read().strip()
+                    self._snapshot = _Snapshot(os.path.join(self.store_dir, version))
+                    self._stamp = stamp
+        return self._snapshot
+
+    def movies(
+        self,
+        genre: Optional[str] = None,
+        unwatched: bool = False,
+        priority: Optional[bool] = None,
+        min_rating: Optional[float] = None,
+        min_votes: Optional[int] = None,
+        netflix: bool = False,
+        prime: bool = False,
+        sort: str = "rating",
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter the watch list.
+
+        Args:
+            genre: only movies of this genre (e.g. "Drama").
+            unwatched: only movies that have not been watched.
+            priority: only movies with (True) or without (False) priority.
+            min_rating: minimum averageRating.
+            min_votes: minimum numVotes.
+            netflix: only movies available on Netflix.
+            prime: only movies available on Amazon Prime.
+            sort: "rating" or "votes" (both descending).
+            limit: maximum number of movies returned.
+
+        Returns:
+            Matching movies as JSON-serializable dicts.
+        """
+        snap = self.snapshot()
+        n_rows: int = snap.movies.num_rows
+        mask = np.ones(n_rows, dtype=bool)
+
+        if min_rating is not None:
+            # Rows are sorted by rating, so the threshold is a prefix
+            mask[np.count_nonzero(snap.ratings >= min_rating) :] = False
+        if min_votes is not None:
+            n_votes: int = np.count_nonzero(snap.votes_sorted >= min_votes)
+            votes_mask = np.zeros(n_rows, dtype=bool)
+            votes_mask[snap.by_votes[:n_votes]] = True
+            mask &= votes_mask
+        if genre is not None:
+            genre_mask = snap.masks.get(f"genre_{genre}")
+            if genre_mask is None:
+                return []
+            mask &= genre_mask
+        if unwatched:
+            mask &= ~snap.masks["watched"]
+        if priority is not None:
+            mask &= snap.masks["priority"] if priority else ~snap.masks["priority"]
+        if netflix:
+            mask &= snap.masks["netflix"]
+        if prime:
+            mask &= snap.masks["prime"]
+
+        if sort == "votes":
+            rows: np.ndarray = snap.by_votes[mask[snap.by_votes]]
+        elif sort == "rating":
+            rows = np.flatnonzero(mask)
+        else:
+            raise ValueError(f"Unknown sort {sort!r}, choose 'rating' or 'votes'")
+
+        rows = np.ascontiguousarray(rows[:limit], dtype=np.int64)
+        indices = pa.Array.from_buffers(pa.int64(), len(rows), [None, pa.py_buffer(rows)])
+        return snap.movies.select(snap.result_columns).take(indices).to_pylist()
+
+    def reviews(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The most recent reviews, newest first (stored in that order)."""
+        return self.snapshot().reviews.slice(0, limit).to_pylist()
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "y")
+
+
+def make_server(
+    store: WatchListStore, host: str = "127.0.0.1", port: int = 8765
+) -> ThreadingHTTPServer:
+    """HTTP server answering /movies and /reviews as JSON."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == "/movies":
+                    body = store.movies(
+                        genre=params.get("genre"),
+                        unwatched=_parse_bool(params.get("unwatched", "0")),
+                        priority=(
+                            _parse_bool(params["priority"]) if "priority" in params else None
+                        ),
+                        min_rating=(
+                            float(params["min_rating"]) if "min_rating" in params else None
+                        ),
+                        min_votes=int(params["min_votes"]) if "min_votes" in params else None,
+                        netflix=_parse_bool(params.get("netflix", "0")),
+                        prime=_parse_bool(params.get("prime", "0")),
+                        sort=params.get("sort", "rating"),
+                        limit=int(params.get("limit", 50)),
+                    )
+                elif url.path == "/reviews":
+                    body = store.reviews(limit=int(params.get("limit", 50)))
+                else:
+                    self.send_error(404, "Use /movies or /reviews")
+                    return
+            except StoreNotBuiltError as exc:
+                self.send_error(503, str(exc))
+                return
+            except ValueError as exc:
+                self.send_error(400, str(exc))
+                return
+
+            payload: bytes = json.dumps(body, default=str).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(store: WatchListStore, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Serve /movies and /reviews as JSON over HTTP until interrupted."""
+    make_server(store, host, port).serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default="data/outputs/query_store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="serve the store over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    movies_parser = commands.add_parser("movies", help="filter the watch list once")
+    movies_parser.add_argument("--genre")
+    movies_parser.add_argument("--unwatched", action="store_true")
+    movies_parser.add_argument(
+        "--priority",
+        action=argparse.BooleanOptionalAction,
+        help="only movies with (--priority) or without (--no-priority) priority",
+    )
+    movies_parser.add_argument("--min-rating", type=float)
+    movies_parser.add_argument("--min-votes", type=int)
+    movies_parser.add_argument("--netflix", action="store_true")
+    movies_parser.add_argument("--prime", action="store_true")
+    movies_parser.add_argument("--sort", choices=["rating", "votes"], default="rating")
+    movies_parser.add_argument("--limit", type=int, default=50)
+
+    reviews_parser = commands.add_parser("reviews", help="list the latest reviews")
+    reviews_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+    store = WatchListStore(args.store)
+    if args.command == "serve":
+        serve(store, args.host, args.port)
+        return
+
+    try:
+        if args.command == "movies":
+            result = store.movies(
+                genre=args.genre,
+                unwatched=args.unwatched,
+                priority=args.priority,
+                min_rating=args.min_rating,
+                min_votes=args.min_votes,
+                netflix=args.netflix,
+                prime=args.prime,
+                sort=args.sort,
+                limit=args.limit,
+            )
+        else:
+            result = store.reviews(limit=args.limit)
+    except StoreNotBuiltError as exc:
+        parser.exit(1, f"{exc}\n")
+    print(json.dumps(result, default=str, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Storage retention: reclaim disk space without touching what the asset graph needs.
+
+Artifacts are grouped in stores that grow with every run or refresh:
+
+- "run_storage": per-run folders in Dagster's storage directory (compute logs, op outputs)
+- "profiles": per-run profiler artifacts in data/profiles
+- "query_store": versions of the query store (the CURRENT one is served)
+- "asset_outputs": pickled outputs of assets that are no longer in the asset graph
+- "shared_memory": memory-mapped copies of cached assets that are not the latest version
+- "temp": leftover .download/.tmp files of interrupted writes
+
+Policies, in order:
+
+1. Never delete a protected artifact: the output of an asset in the graph, anything
+   referenced by (or written by the run of) the latest materialization of an asset,
+   the current query store version, and everything of runs still in progress.
+2. Keep the newest `keep_versions` entries of every versioned store (run storage,
+   profiles, query store). The IMDb dumps and the asset pickles are replaced in place
+   on every refresh, so there are no older versions of them to keep.
+3. Delete the orphaned and stale entries (asset_outputs, shared_memory, temp).
+4. While the stores take more than `max_bytes`, delete the oldest remaining
+   unprotected entries, whatever their store.
+
+Runs as the scheduled `storage_retention_job`, or by hand:
+
+    python -m imdb_dagster.retention --dry-run
+    python -m imdb_dagster.retention --keep-versions 2 --max-gb 10
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import dagster as dg
+
+from .defs.assets import constants
+from .defs.assets.resources import cache_version, dataset_cache_dir, shared_path
+
+# Stores whose entries are versions (newest kept), as opposed to orphaned or stale files
+VERSIONED_STORES = ["run_storage", "profiles", "query_store"]
+# Suffixes of files written next to their target and renamed when complete
+TEMP_SUFFIXES = (".download", ".tmp")
+# Runs that may still write to their folders
+ACTIVE_RUN_STATUSES = [
+    dg.DagsterRunStatus.QUEUED,
+    dg.DagsterRunStatus.NOT_STARTED,
+    dg.DagsterRunStatus.STARTING,
+    dg.DagsterRunStatus.STARTED,
+    dg.DagsterRunStatus.CANCELING,
+]
+
+
+@dataclass
+class Artifact:
+    store: str
+    path: str
+    size_bytes: int
+    modified: float
+    # Why it must be kept; None when it may be deleted
+    protected: Optional[str] = None
+    # Why it is deleted; None when it is kept
+    delete_reason: Optional[str] = None
+
+
+def path_size(path: str) -> int:
+    """Size in bytes of a file, or of all files below a folder."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, file_name))
+        for root, _, file_names in os.walk(path)
+        for file_name in file_names
+    )
+
+
+def _entry(store: str, path: str) -> Artifact:
+    return Artifact(store, path, path_size(path), os.path.getmtime(path))
+
+
+def _folder_entries(store: str, folder: str) -> List[Artifact]:
+    if not os.path.isdir(folder):
+        return []
+    return [_entry(store, os.path.join(folder, name)) for name in os.listdir(folder)]
+
+
+def referenced_paths(instance: dg.DagsterInstance, asset_graph) -> Dict[str, str]:
+    """
+    Paths and runs the latest materialization of every asset in the graph refers to.
+
+    Returns:
+        Dict of absolute path (or run id) to the asset referring to it.
+    """
+    references: Dict[str, str] = {}
+    for key in asset_graph.get_all_asset_keys():
+        event = instance.get_latest_materialization_event(key)
+        if event is None or event.asset_materialization is None:
+            continue
+        asset: str = key.to_user_string()
+        references[event.run_id] = asset
+        for value in event.asset_materialization.metadata.values():
+            if isinstance(value, dg.PathMetadataValue):
+                references[os.path.abspath(value.path)] = asset
+    return references
+
+
+def collect_artifacts(
+    instance: dg.DagsterInstance,
+    asset_graph,
+    storage_dir: str,
+    shared_memory_dir: Optional[str] = None,
+    temp_max_age_hours: float = constants.RETENTION_TEMP_MAX_AGE_HOURS,
+) -> List[Artifact]:
+    """Every artifact of the managed stores, with the reason it is protected (if any)."""
+    references: Dict[str, str] = referenced_paths(instance, asset_graph)
+    active_runs: Set[str] = set(
+        instance.get_run_ids(filters=dg.RunsFilter(statuses=ACTIVE_RUN_STATUSES))
+    )
+    graph_keys: Set[dg.AssetKey] = set(asset_graph.get_all_asset_keys())
+    # Keys ever materialized; a storage file is only treated as an asset output if
+    # it belongs to one of them
+    known_keys: Set[dg.AssetKey] = set(instance.get_asset_keys())
+    output_paths: Dict[str, dg.AssetKey] = {
+        os.path.join(storage_dir, *key.path): key for key in known_keys
+    }
+
+    artifacts: List[Artifact] = []
+    for artifact in _folder_entries("run_storage", storage_dir):
+        run_id: str = os.path.basename(artifact.path)
+        if artifact.path in output_paths:
+            artifact.store = "asset_outputs"
+            key: dg.AssetKey = output_paths[artifact.path]
+            if key in graph_keys:
+                artifact.protected = f"output of {key.to_user_string()}"
+        elif not instance.has_run(run_id):
+            # Neither a run folder nor an asset output: not ours to manage
+            continue
+        artifacts.append(artifact)
+
+    artifacts.extend(_folder_entries("profiles", constants.PROFILE_DIR_PATH))
+
+    current_path = os.path.join(constants.QUERY_STORE_DIR_PATH, "CURRENT")
+    current_version: Optional[str] = None
+    if os.path.exists(current_path):
+        with open(current_path) as f:
+            current_version = f.read().strip()
+    for artifact in _folder_entries("query_store", constants.QUERY_STORE_DIR_PATH):
+        if os.path.isdir(artifact.path):
+            if os.path.basename(artifact.path) == current_version:
+                artifact.protected = "current query store version"
+            artifacts.append(artifact)
+
+    if shared_memory_dir is not None:
+        current_segments: Set[str] = set()
+        for key in graph_keys:
+            version: Optional[str] = cache_version(instance, key)
+            if version is not None:
+                current_segments.add(
+                    shared_path(shared_memory_dir, key.to_python_identifier(), version)
+                )
+        for artifact in _folder_entries("shared_memory", shared_memory_dir):
+            if artifact.path in current_segments:
+                artifact.protected = "latest version of a cached asset"
+            elif artifact.path.endswith(TEMP_SUFFIXES):
+                artifact.store = "temp"
+            artifacts.append(artifact)
+
+    for root, _, file_names in os.walk(constants.DATA_DIR_PATH):
+        for file_name in file_names:
+            if file_name.endswith(TEMP_SUFFIXES):
+                artifacts.append(_entry("temp", os.path.join(root, file_name)))
+
+    now: float = time.time()
+    for artifact in artifacts:
+        if artifact.protected is not None:
+            continue
+        name: str = os.path.basename(artifact.path)
+        if name in active_runs:
+            artifact.protected = "run in progress"
+        elif name in references:
+            artifact.protected = f"run of the latest {references[name]}"
+        elif artifact.store == "temp" and now - artifact.modified < temp_max_age_hours * 3600:
+            artifact.protected = "may still be written"
+        else:
+            # A referenced file inside a folder protects the whole folder
+            prefix: str = os.path.abspath(artifact.path)
+            for path, asset in references.items():
+                if path == prefix or path.startswith(prefix + os.sep):
+                    artifact.protected = f"referenced by {asset}"
+                    break
+    return artifacts
+
+
+def select_deletions(
+    artifacts: List[Artifact],
+    keep_versions: int = constants.RETENTION_KEEP_VERSIONS,
+    max_bytes: Optional[int] = constants.RETENTION_MAX_BYTES,
+) -> List[Artifact]:
+    """
+    Apply the retention policies; sets `delete_reason` on the artifacts to delete.
+
+    Returns:
+        The artifacts to delete, oldest first.
+    """
+    for store in VERSIONED_STORES:
+        entries = sorted(
+            (a for a in artifacts if a.store == store), key=lambda a: a.modified, reverse=True
+        )
+        for artifact in entries[keep_versions:]:
+            if artifact.protected is None:
+                artifact.delete_reason = f"older than the last {keep_versions} versions"
+
+    for artifact in artifacts:
+        if artifact.protected is None and artifact.store not in VERSIONED_STORES:
+            artifact.delete_reason = {
+                "asset_outputs": "asset no longer in the graph",
+                "shared_memory": "not the latest version",
+                "temp": "left over from an interrupted write",
+            }[artifact.store]
+
+    if max_bytes is not None:
+        remaining: int = sum(a.size_bytes for a in artifacts if a.delete_reason is None)
+        for artifact in sorted(artifacts, key=lambda a: a.modified):
+            if remaining <= max_bytes:
+                break
+            if artifact.protected is None and artifact.delete_reason is None:
+                artifact.delete_reason = "over the size cap"
+                remaining -= artifact.size_bytes
+
+    return sorted(
+        (a for a in artifacts if a.delete_reason is not None), key=lambda a: a.modified
+    )
+
+
+def delete(artifacts: List[Artifact]) -> int:
+    """Delete the artifacts; returns the bytes reclaimed."""
+    reclaimed: int = 0
+    for artifact in artifacts:
+        if not os.path.exists(artifact.path):
+            continue
+        if os.path.isdir(artifact.path):
+            shutil.rmtree(artifact.path)
+        else:
+            os.remove(artifact.path)
+        reclaimed += artifact.size_bytes
+    return reclaimed
+
+
+def collect_garbage(
+    instance: dg.DagsterInstance,
+    asset_graph,
+    keep_versions: int = constants.RETENTION_KEEP_VERSIONS,
+    max_bytes: Optional[int] = constants.RETENTION_MAX_BYTES,
+    dry_run: bool = False,
+) -> Dict[str, object]:
+    """
+    Collect the artifacts, apply the policies and (unless `dry_run`) delete.
+
+    Returns:
+        The deleted (or, with `dry_run`, deletable) artifacts, the bytes reclaimed,
+        the bytes kept per store and how far the kept bytes are over the size cap
+        (protected artifacts alone can exceed it).
+    """
+    artifacts: List[Artifact] = collect_artifacts(
+        instance,
+        asset_graph,
+        instance.storage_directory(),
+        dataset_cache_dir(),
+    )
+    deletions: List[Artifact] = select_deletions(artifacts, keep_versions, max_bytes)
+    reclaimed: int = (
+        sum(a.size_bytes for a in deletions) if dry_run else delete(deletions)
+    )
+
+    kept_bytes: Dict[str, int] = {}
+    for artifact in artifacts:
+        if artifact.delete_reason is None:
+            kept_bytes[artifact.store] = kept_bytes.get(artifact.store, 0) + artifact.size_bytes
+    return {
+        "deleted": deletions,
+        "bytes_reclaimed": reclaimed,
+        "kept_bytes": kept_bytes,
+        "over_cap_bytes": (
+            max(sum(kept_bytes.values()) - max_bytes, 0) if max_bytes is not None else 0
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keep-versions", type=int, default=constants.RETENTION_KEEP_VERSIONS)
+    parser.add_argument(
+        "--max-gb", type=float, default=constants.RETENTION_MAX_BYTES / 1024**3
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    from .definitions import defs
+
+    with dg.DagsterInstance.get() as instance:
+        report = collect_garbage(
+            instance,
+            defs().resolve_asset_graph(),
+            args.keep_versions,
+            int(args.max_gb * 1024**3),
+            args.dry_run,
+        )
+
+    for artifact in report["deleted"]:
+        print(
+            f"{'would delete' if args.dry_run else 'deleted'}  {artifact.store:<13}  "
+            f"{artifact.size_bytes / 1024**2:>9.1f} MiB  {artifact.path}  ({artifact.delete_reason})"
+        )
+    for store, size in sorted(report["kept_bytes"].items()):
+        print(f"kept          {store:<13}  {size / 1024**2:>9.1f} MiB")
+    print(
+        f"{'reclaimable' if args.dry_run else 'reclaimed'}: "
+        f"{report['bytes_reclaimed'] / 1024**2:.1f} MiB"
+    )
+    if report["over_cap_bytes"]:
+        print(f"still {report['over_cap_bytes'] / 1024**2:.1f} MiB over the size cap")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
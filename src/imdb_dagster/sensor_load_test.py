@@ -0,0 +1,182 @@
+"""
+Load-testing harness for the project's sensors.
+
+Builds sensor contexts against an ephemeral Dagster instance seeded with synthetic
+materialization events, in a scratch folder holding the tracked input files plus
+many unrelated ones. Every sensor is driven through a number of ticks (with input
+files being touched in between) and the harness reports p50/p99 evaluation time,
+the requests queued for the coalescing sensor, the run requests emitted and the run
+keys that were emitted more than once. The coalescing sensor is driven last, with its
+window closed, so its runs are what the queued requests of all sensors turn into.
+
+    python -m imdb_dagster.sensor_load_test --ticks 200 --events 5000 --files 2000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import dagster as dg
+
+from . import coalescing
+from .defs.assets import constants
+
+TRACKED_FILES = [
+    constants.TITLE_BASICS_FILE_PATH,
+    constants.TITLE_RATINGS_FILE_PATH,
+    constants.TITLE_PRINCIPALS_FILE_PATH,
+    constants.TITLE_CREW_FILE_PATH,
+    constants.NAME_BASICS_FILE_PATH,
+    constants.STATUS_FILE_PATH,
+    constants.DATES_AND_SCORES_FILE_PATH,
+]
+
+
+def seed_files(root: str, extra_files: int) -> None:
+    """Create the tracked input files plus `extra_files` unrelated ones under `root`."""
+    for file_path in TRACKED_FILES:
+        path = os.path.join(root, file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("tconst\n")
+
+    for i in range(extra_files):
+        folder = os.path.dirname(os.path.join(root, TRACKED_FILES[i % len(TRACKED_FILES)]))
+        with open(os.path.join(folder, f"synthetic_{i}.csv"), "w") as f:
+            f.write("tconst\n")
+
+
+def seed_events(instance: dg.DagsterInstance, asset_keys: List[dg.AssetKey], events: int) -> None:
+    """Report `events` synthetic materializations spread over `asset_keys`."""
+    for i in range(events):
+        instance.report_runless_asset_event(
+            dg.AssetMaterialization(
+                asset_key=asset_keys[i % len(asset_keys)],
+                metadata={"synthetic": i},
+            )
+        )
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+def run_load_test(
+    ticks: int = 100,
+    events: int = 2000,
+    extra_files: int = 1000,
+    change_rate: float = 0.1,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Drive every sensor of the project through `ticks` evaluations.
+
+    Args:
+        ticks: number of evaluations per sensor.
+        events: synthetic materialization events seeded into the instance.
+        extra_files: unrelated files created next to the tracked input files.
+        change_rate: chance per tick that a tracked file is touched (or, for the
+            freshness sensors, aged past its staleness window).
+        seed: seed of the random file changes.
+
+    Returns:
+        Per sensor: p50/p99 evaluation time in ms, requests queued for coalescing,
+        run requests and duplicate run keys.
+    """
+    from .definitions import defs
+
+    definitions: dg.Definitions = defs()
+    rng = random.Random(seed)
+    report: Dict[str, Dict[str, float]] = {}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root, dg.DagsterInstance.ephemeral() as instance:
+        seed_files(root, extra_files)
+        asset_keys = list(definitions.resolve_asset_graph().get_all_asset_keys())
+        seed_events(instance, asset_keys, events)
+
+        # The sensors resolve the input files relative to the working directory
+        os.chdir(root)
+        try:
+            sensors = sorted(
+                definitions.sensors or [],
+                key=lambda sensor: sensor.name == coalescing.COALESCING_SENSOR_NAME,
+            )
+            for sensor in sensors:
+                cursor: Optional[str] = None
+                durations: List[float] = []
+                run_keys: Counter = Counter()
+                run_requests = 0
+                first_request_id: int = coalescing.last_request_id()
+
+                for _ in range(ticks):
+                    if rng.random() < change_rate:
+                        file_path = rng.choice(TRACKED_FILES)
+                        stamp = time.time() - rng.choice([0, 48 * 3600])
+                        os.utime(file_path, (stamp, stamp))
+
+                    context = dg.build_sensor_context(
+                        instance=instance,
+                        cursor=cursor,
+                        sensor_name=sensor.name,
+                        definitions=definitions,
+                    )
+                    start = time.perf_counter()
+                    if sensor.name == coalescing.COALESCING_SENSOR_NAME:
+                        # The window never closes within the test's ticks, so evaluate
+                        # the sensor's policy with the window already closed
+                        result = coalescing.coalesce(context, window_seconds=0)
+                        if isinstance(result, dg.SkipReason):
+                            result = dg.SensorResult(skip_reason=result)
+                    else:
+                        result = sensor.evaluate_tick(context)
+                    durations.append((time.perf_counter() - start) * 1000)
+
+                    cursor = result.cursor if result.cursor is not None else cursor
+                    run_requests += len(result.run_requests or [])
+                    run_keys.update(
+                        request.run_key for request in result.run_requests or [] if request.run_key
+                    )
+
+                report[sensor.name] = {
+                    "p50_ms": _percentile(durations, 50),
+                    "p99_ms": _percentile(durations, 99),
+                    "queued": coalescing.last_request_id() - first_request_id,
+                    "run_requests": run_requests,
+                    "duplicate_run_keys": sum(count - 1 for count in run_keys.values()),
+                }
+        finally:
+            os.chdir(cwd)
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--change-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.ticks, args.events, args.files, args.change_rate, args.seed)
+    name_width = max(len(name) for name in report)
+    print(
+        f"{'sensor':<{name_width}}  {'p50 ms':>8}  {'p99 ms':>8}  {'queued':>6}  {'runs':>6}"
+        f"  {'dup keys':>8}"
+    )
+    for name, stats in report.items():
+        print(
+            f"{name:<{name_width}}  {stats['p50_ms']:>8.2f}  {stats['p99_ms']:>8.2f}"
+            f"  {stats['queued']:>6}  {stats['run_requests']:>6}  {stats['duplicate_run_keys']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import dagster as dg
+import pandas as pd
+
+from imdb_dagster.defs.assets import checks
+
+TITLE_BASICS = pd.DataFrame(
+    {"primaryTitle": ["Heat", "Ran", "Alien"]},
+    index=pd.Index(["tt01", "tt02", "tt03"], name="tconst"),
+)
+WATCH_STATUS = pd.DataFrame(
+    {"watched": [True, False, True]},
+    # tt99 is not an IMDb title
+    index=pd.Index(["tt01", "tt02", "tt99"], name="tconst"),
+)
+WATCHED_DATES_AND_SCORES = pd.DataFrame(
+    {"enjoyment_score": [3.0, 4.0, 5.0, 1.0]},
+    # tt02 is not marked watched, tt03 is not on the watch list, tt98 does not exist
+    index=pd.Index(["tt01", "tt02", "tt03", "tt98"], name="tconst"),
+)
+SOURCES = {"watch_status": WATCH_STATUS, "watched_dates_and_scores": WATCHED_DATES_AND_SCORES}
+
+
+def _results(watch_status=WATCH_STATUS):
+    facts = checks.rule_facts(watch_status, WATCHED_DATES_AND_SCORES, TITLE_BASICS)
+    sources = dict(SOURCES, watch_status=watch_status)
+    return {
+        rule.name: checks.evaluate_rule(rule, sources[rule.source], facts[rule.source])
+        for rule in checks.RULES
+    }
+
+
+def test_rules_report_the_missing_ids():
+    results = _results()
+
+    assert {name: result.passed for name, result in results.items()} == {
+        "watch_status_has_no_duplicate_tconst": True,
+        "watch_status_tconst_exists_in_title_basics": False,
+        "watched_dates_and_scores_tconst_exists_in_title_basics": False,
+        "watched_dates_and_scores_tconst_in_watch_status": False,
+        "watched_dates_and_scores_marked_as_watched": False,
+    }
+    missing = results["watched_dates_and_scores_tconst_in_watch_status"].metadata
+    assert missing["missing_tconst"].value == ["tt03", "tt98"]
+    assert missing["message"].value == "Missing tconst values: ['tt03', 'tt98']"
+    assert missing["failing_rows"].value == 2
+    not_watched = results["watched_dates_and_scores_marked_as_watched"].metadata
+    assert not_watched["not_watched_in_watch_status"].value == ["tt02"]
+    assert results["watch_status_has_no_duplicate_tconst"].metadata["message"].value == (
+        "No failing rows"
+    )
+
+
+def test_duplicates_are_reported_once():
+    duplicated = pd.concat([WATCH_STATUS, WATCH_STATUS.iloc[[0, 0]]])
+
+    result = _results(duplicated)["watch_status_has_no_duplicate_tconst"]
+
+    assert not result.passed
+    assert result.metadata["duplicates"].value == ["tt01"]
+    assert result.metadata["failing_rows"].value == 2
+
+
+def test_failing_checks_block_downstream_assets():
+    @dg.asset(name="title_basics")
+    def title_basics():
+        return TITLE_BASICS
+
+    @dg.asset(name="watch_status")
+    def watch_status():
+        return WATCH_STATUS
+
+    @dg.asset(name="watched_dates_and_scores")
+    def watched_dates_and_scores():
+        return WATCHED_DATES_AND_SCORES
+
+    @dg.asset(deps=["watch_status"])
+    def my_movie_list():
+        return 1
+
+    result = dg.materialize(
+        [
+            title_basics,
+            watch_status,
+            watched_dates_and_scores,
+            my_movie_list,
+            checks.validate_inputs,
+        ],
+        resources={"io_manager": dg.InMemoryIOManager()},
+        raise_on_error=False,
+    )
+
+    assert all(spec.blocking for spec in checks.validate_inputs.check_specs)
+    assert not result.success
+    assert dg.AssetKey("my_movie_list") not in {
+        event.asset_key for event in result.get_asset_materialization_events()
+    }
@@ -0,0 +1,141 @@
+import json
+import time
+import uuid
+
+import dagster as dg
+import pytest
+
+from imdb_dagster import coalescing
+from imdb_dagster.defs.assets import constants
+
+BASICS = dg.AssetKey("needed_title_basics")
+RATINGS = dg.AssetKey("needed_title_ratings")
+LIST = dg.AssetKey("my_movie_list")
+
+
+@pytest.fixture(autouse=True)
+def _pending_store(tmp_path, monkeypatch):
+    # The pending store lives at a relative path under the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def instance():
+    with dg.instance_for_test() as instance:
+        yield instance
+
+
+def _stored_requests():
+    with open(constants.PENDING_RUNS_STATE_FILE_PATH) as f:
+        return json.load(f)["requests"]
+
+
+def _add_run(instance, status, asset_keys):
+    instance.add_run(
+        dg.DagsterRun(
+            job_name="__ASSET_JOB",
+            run_id=str(uuid.uuid4()),
+            status=status,
+            asset_selection=frozenset(asset_keys),
+        )
+    )
+
+
+def _request(asset_keys, changed_at=None, requested_at=100.0):
+    return {
+        "asset_keys": sorted(key.to_user_string() for key in asset_keys),
+        "changed_at": changed_at,
+        "requested_at": requested_at,
+    }
+
+
+def test_enqueue_replaces_the_pending_request_of_a_sensor():
+    first = coalescing.enqueue("basics_sensor", {BASICS, LIST}, changed_at=20.0)
+    coalescing.enqueue("ratings_sensor", {RATINGS}, changed_at=30.0)
+    replaced = coalescing.enqueue("basics_sensor", {LIST, BASICS}, changed_at=10.0)
+
+    requests = {request["source"]: request for request in _stored_requests()}
+    assert len(requests) == 2
+    assert (first, replaced) == (1, 3)
+    assert requests["basics_sensor"]["id"] == replaced
+    # The latest change wins; the request keeps the time it was first queued
+    assert requests["basics_sensor"]["changed_at"] == 20.0
+    assert requests["basics_sensor"]["queued_at"] < requests["basics_sensor"]["requested_at"]
+    assert coalescing.last_request_id() == 3
+
+
+def test_covers():
+    run_keys = {BASICS, LIST}
+
+    assert not coalescing._covers({BASICS}, True, 200.0, _request({BASICS, LIST}))
+    # A change is only seen by runs created after it, in flight or not
+    assert coalescing._covers(run_keys, True, 200.0, _request({BASICS}, changed_at=150.0))
+    assert not coalescing._covers(run_keys, True, 100.0, _request({BASICS}, changed_at=150.0))
+    # Without one, any run in flight fixes the state, a finished one only if newer
+    assert coalescing._covers(run_keys, True, 50.0, _request({BASICS}))
+    assert not coalescing._covers(run_keys, False, 50.0, _request({BASICS}))
+    assert coalescing._covers(run_keys, False, 150.0, _request({BASICS}))
+
+
+def test_waits_for_the_window_then_launches_one_run(instance):
+    coalescing.enqueue("basics_sensor", {BASICS, LIST}, reason="basics")
+    coalescing.enqueue("ratings_sensor", {RATINGS, LIST}, reason="ratings")
+    context = dg.build_sensor_context(instance=instance)
+
+    waiting = coalescing.coalesce(context, window_seconds=3600, max_wait_seconds=3600)
+    assert isinstance(waiting, dg.SkipReason)
+
+    # The oldest request has waited long enough, even though requests keep arriving
+    result = coalescing.coalesce(context, window_seconds=3600, max_wait_seconds=0)
+    (run_request,) = result.run_requests
+    assert set(run_request.asset_selection) == {BASICS, RATINGS, LIST}
+    assert run_request.run_key == "coalesced_1_2"
+    assert run_request.tags[coalescing.SOURCES_TAG] == "basics_sensor,ratings_sensor"
+    assert result.cursor == "2"
+
+
+def test_holds_back_while_a_run_materializes_the_same_assets(instance):
+    _add_run(instance, dg.DagsterRunStatus.STARTED, {LIST})
+    # The change happened after the busy run was created, so it doesn't cover it
+    coalescing.enqueue("basics_sensor", {BASICS, LIST}, changed_at=time.time() + 1)
+
+    result = coalescing.coalesce(dg.build_sensor_context(instance=instance), window_seconds=0)
+
+    assert isinstance(result, dg.SkipReason)
+    assert "Holding back 1 requests" in result.skip_message
+
+
+def test_drops_covered_requests(instance):
+    coalescing.enqueue("upstream_sensor", {BASICS})
+    _add_run(instance, dg.DagsterRunStatus.STARTED, {BASICS, LIST})
+    coalescing.enqueue("ratings_sensor", {RATINGS}, changed_at=time.time())
+
+    result = coalescing.coalesce(dg.build_sensor_context(instance=instance), window_seconds=0)
+
+    (run_request,) = result.run_requests
+    assert run_request.asset_selection == [RATINGS]
+    assert run_request.tags[coalescing.SOURCES_TAG] == "ratings_sensor"
+
+    _add_run(instance, dg.DagsterRunStatus.SUCCESS, {RATINGS})
+    covered = coalescing.coalesce(dg.build_sensor_context(instance=instance), window_seconds=0)
+    assert not covered.run_requests
+    assert covered.cursor == "2"
+
+
+def test_prunes_only_through_the_committed_cursor(instance):
+    for source in ("basics_sensor", "ratings_sensor"):
+        coalescing.enqueue(source, {BASICS})
+
+    # A tick whose result was not committed leaves the store as it was
+    coalescing.coalesce(dg.build_sensor_context(instance=instance), window_seconds=0)
+    assert [request["id"] for request in _stored_requests()] == [1, 2]
+
+    result = coalescing.coalesce(
+        dg.build_sensor_context(instance=instance, cursor="1"), window_seconds=0
+    )
+    assert [request["id"] for request in _stored_requests()] == [2]
+    assert result.run_requests[0].run_key == "coalesced_2_2"
+
+    # A later enqueue does not bring back what the cursor consumed
+    coalescing.enqueue("basics_sensor", {BASICS})
+    assert [request["id"] for request in _stored_requests()] == [2, 3]
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from imdb_dagster import cold_start
+
+
+@pytest.fixture(scope="module")
+def measurement():
+    measured = cold_start.measure_definition_load()
+    print(
+        f"definitions loaded in {measured['seconds']:.2f}s, "
+        f"{len(measured['modules'])} modules imported"
+    )
+    return measured
+
+
+def test_definitions_load_without_heavy_modules(measurement):
+    # The wall-clock time depends on the machine; the imported modules do not
+    assert cold_start.check_budget(measurement, max_seconds=None) == []
+
+
+@pytest.mark.skipif(
+    not os.environ.get("IMDB_DAGSTER_TIMING_TESTS"),
+    reason="wall-clock budget; set IMDB_DAGSTER_TIMING_TESTS=1 to check it",
+)
+def test_definitions_load_within_time_budget(measurement):
+    assert cold_start.check_budget(measurement) == []
+
+
+def test_check_budget_reports_forbidden_modules():
+    measurement = {"seconds": 0.1, "modules": ["dagster", "bokeh", "bokeh.plotting"]}
+    assert cold_start.check_budget(measurement) == [
+        "eagerly imported: ['bokeh', 'bokeh.plotting']"
+    ]
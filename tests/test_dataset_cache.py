@@ -0,0 +1,87 @@
+import os
+
+import dagster as dg
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from imdb_dagster.defs.assets.resources import CachingFilesystemIOManager
+
+
+@dg.asset
+def catalog() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "averageRating": pd.array([7.5, None, 6.0], dtype=pd.ArrowDtype(pa.float32())),
+            # Categorical with Arrow-backed categories, like title_basics.genres
+            "genres": pd.array(["Drama", "Comedy", None], dtype=pd.ArrowDtype(pa.string()))
+            .astype("category"),
+            "watched": [True, False, False],
+        },
+        index=pd.Index(
+            pd.array(["tt01", "tt02", "tt03"], dtype=pd.ArrowDtype(pa.string())), name="tconst"
+        ),
+    )
+
+
+@dg.asset
+def rated(catalog: pd.DataFrame) -> int:
+    return int(catalog["averageRating"].notna().sum())
+
+
+def test_separate_runs_share_the_cache(tmp_path):
+    io_manager = CachingFilesystemIOManager(
+        base_dir=str(tmp_path / "storage"),
+        cached_assets=["catalog"],
+        shared_memory_dir=str(tmp_path / "cache"),
+    )
+    with dg.instance_for_test() as instance:
+        first = dg.materialize(
+            [catalog, rated], instance=instance, resources={"io_manager": io_manager}
+        )
+        assert first.success
+        assert len(os.listdir(tmp_path / "cache")) == 1
+
+        # Without the pickle, the next run can only load catalog from the cache file
+        os.remove(tmp_path / "storage" / "catalog")
+        second = dg.materialize(
+            [catalog, rated],
+            selection=[rated],
+            instance=instance,
+            resources={"io_manager": io_manager},
+        )
+        assert second.success
+        assert second.output_for_node("rated") == 2
+
+
+def test_cached_frame_round_trips_without_copying_arrow_columns(tmp_path):
+    frame = catalog()
+    io_manager = CachingFilesystemIOManager(shared_memory_dir=str(tmp_path))
+    io_manager._store_shared("catalog", "1-abc", frame)
+    pd.testing.assert_frame_equal(io_manager._load_shared("catalog", "1-abc"), frame)
+
+    ratings = pd.DataFrame(
+        {"averageRating": pd.array(np.arange(1e6, dtype="float32"), dtype="float[pyarrow]")},
+        index=pd.Index(pd.array(np.arange(1e6, dtype="int32"), dtype="int32[pyarrow]"), name="id"),
+    )
+    io_manager._store_shared("ratings", "1-abc", ratings)
+    allocated = pa.total_allocated_bytes()
+    loaded = io_manager._load_shared("ratings", "1-abc")
+    # The 8 MB of column and index data stay in the mapped file
+    assert pa.total_allocated_bytes() - allocated < 1024
+    assert loaded.equals(ratings)
+
+
+def test_older_versions_and_files_over_the_cap_are_dropped(tmp_path):
+    frame = catalog()
+    io_manager = CachingFilesystemIOManager(shared_memory_dir=str(tmp_path))
+    io_manager._store_shared("catalog", "1-abc", frame)
+    io_manager._store_shared("catalog", "2-def", frame)
+    assert os.listdir(tmp_path) == ["catalog-2-def.arrow"]
+
+    small = CachingFilesystemIOManager(
+        shared_memory_dir=str(tmp_path),
+        max_bytes=os.path.getsize(tmp_path / "catalog-2-def.arrow") + 1,
+    )
+    small._store_shared("other", "3-aaa", frame)
+    assert os.listdir(tmp_path) == ["other-3-aaa.arrow"]
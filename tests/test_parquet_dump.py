@@ -0,0 +1,49 @@
+import gzip
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from imdb_dagster import helpers
+
+
+def _write_dump(path, rows):
+    with gzip.open(path, "wt") as f:
+        f.write("tconst\tnumVotes\n")
+        f.writelines(f"{tconst}\t{votes}\n" for tconst, votes in rows)
+
+
+def test_parquet_copy_freshness(tmp_path):
+    dump = str(tmp_path / "title.ratings.tsv.gz")
+    _write_dump(dump, [("tt01", 10), ("tt02", "\\N")])
+    assert helpers.has_fresh_parquet(dump) is False
+
+    helpers.transcode_to_parquet(dump, {"numVotes": "int32"})
+    assert helpers.has_fresh_parquet(dump) is True
+    df = helpers.read_dump(dump, "tconst", {})
+    assert df["numVotes"].isna().tolist() == [False, True]
+
+    # A newer download makes the copy stale
+    modified = os.path.getmtime(helpers.parquet_path(dump)) + 10
+    os.utime(dump, (modified, modified))
+    assert helpers.has_fresh_parquet(dump) is False
+
+    # Without the dump the copy is all there is
+    os.remove(dump)
+    assert helpers.has_fresh_parquet(dump) is True
+    assert helpers.read_dump(dump, "tconst", {}).index.tolist() == ["tt01", "tt02"]
+
+
+def test_failed_transcode_leaves_no_partial_file(tmp_path):
+    dump = str(tmp_path / "title.ratings.tsv.gz")
+    _write_dump(dump, [("tt01", 10)])
+    helpers.transcode_to_parquet(dump, {"numVotes": "int32"})
+
+    _write_dump(dump, [("tt01", 10), ("tt02", "many")])
+    with pytest.raises(pa.ArrowInvalid):
+        helpers.transcode_to_parquet(dump, {"numVotes": "int32"})
+
+    assert sorted(os.listdir(tmp_path)) == ["title.ratings.parquet", "title.ratings.tsv.gz"]
+    # The previous copy is untouched
+    assert pq.read_table(helpers.parquet_path(dump)).num_rows == 1
@@ -0,0 +1,40 @@
+import dagster as dg
+
+from imdb_dagster import profiling
+from imdb_dagster.definitions import defs
+
+
+def _compute_functions(definitions):
+    return {
+        op_def.name: op_def.compute_fn.decorated_fn
+        for definition in [*definitions.assets, *definitions.asset_checks]
+        if isinstance(definition, dg.AssetsDefinition) and definition.is_executable
+        for op_def in definition.node_def.iterate_op_defs()
+    }
+
+
+def test_every_asset_and_check_is_profiled():
+    functions = _compute_functions(defs())
+
+    assert {"imdb_datasets", "needed_title_basics", "validate_inputs"} <= set(functions)
+    assert all(getattr(fn, profiling.PROFILED_ATTRIBUTE, False) for fn in functions.values())
+    # Building the definitions again does not wrap them twice
+    assert _compute_functions(defs()) == functions
+
+
+def test_profiled_asset_reports_its_profile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    @dg.asset
+    def numbers() -> dg.MaterializeResult:
+        return dg.MaterializeResult(value=sum(range(100_000)))
+
+    definitions = profiling.profile_definitions(dg.Definitions(assets=[numbers]))
+    result = dg.materialize(
+        definitions.assets,
+        tags={profiling.PROFILE_TAG: "cpu"},
+        resources={"io_manager": dg.InMemoryIOManager()},
+    )
+
+    (materialization,) = result.get_asset_materialization_events()
+    assert any(key.startswith("profile_") for key in materialization.materialization.metadata)
@@ -0,0 +1,71 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from imdb_dagster import query_service
+
+
+def _movie_list(ratings):
+    tconsts = [f"tt{i:02d}" for i in range(len(ratings))]
+    return pd.DataFrame(
+        {
+            "primaryTitle": [f"Movie {tconst}" for tconst in tconsts],
+            "averageRating": pd.array(ratings, dtype=pd.ArrowDtype(pa.float32())),
+            "numVotes": pd.array(range(len(ratings)), dtype=pd.ArrowDtype(pa.int32())),
+            "watched": [False] * len(ratings),
+            "priority": [True] * len(ratings),
+            "netflix": [False] * len(ratings),
+            "prime": [False] * len(ratings),
+            "genre_Drama": [True] * len(ratings),
+        },
+        index=pd.Index(tconsts, name="tconst"),
+    )
+
+
+REVIEWS = pd.DataFrame(
+    {"date": pd.array([None], dtype=pd.ArrowDtype(pa.date32())), "enjoyment_score": [3.0]},
+    index=pd.Index(["tt00"], name="tconst"),
+)
+
+
+def _versions(store_dir):
+    return sorted(name for name in os.listdir(store_dir) if os.path.isdir(store_dir / name))
+
+
+def test_new_versions_are_picked_up_and_old_ones_pruned(tmp_path):
+    store = query_service.WatchListStore(str(tmp_path))
+
+    written = [query_service.write_store(_movie_list([7.0]), REVIEWS, str(tmp_path))]
+    assert len(store.movies()) == 1
+
+    for n_movies in (2, 3):
+        written.append(
+            query_service.write_store(_movie_list([7.0] * n_movies), REVIEWS, str(tmp_path))
+        )
+        # The reader that is already open switches to the new version
+        assert len(store.movies()) == n_movies
+
+    assert (tmp_path / query_service.CURRENT_FILE).read_text() == written[-1]
+    assert _versions(tmp_path) == written[-query_service.KEEP_VERSIONS :]
+
+
+def test_missing_store(tmp_path):
+    store = query_service.WatchListStore(str(tmp_path / "query_store"))
+    with pytest.raises(query_service.StoreNotBuiltError):
+        store.movies()
+
+    server = query_service.make_server(store, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/movies")
+        assert error.value.code == 503
+    finally:
+        server.shutdown()
+        server.server_close()
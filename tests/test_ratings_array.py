@@ -0,0 +1,43 @@
+import pandas as pd
+
+from imdb_dagster import helpers
+from imdb_dagster.defs.assets import constants
+
+
+def _title_ratings() -> pd.DataFrame:
+    df = pd.DataFrame(
+        {
+            "averageRating": [5.5, 7.25, 9.0, 3.0],
+            "numVotes": [10, 2000, 35, 1],
+        },
+        index=pd.Index(["tt0000001", "tt0000042", "tt1160419", "tt9999999"], name="tconst"),
+    )
+    return df.astype(helpers.arrow_dtypes(constants.TITLE_RATINGS_PARQUET_TYPES))
+
+
+def test_gather_matches_loc_on_intersection(tmp_path):
+    title_ratings = _title_ratings()
+    file_path = str(tmp_path / "title.ratings.npy")
+    helpers.write_ratings_array(title_ratings, file_path)
+
+    # Rewatched titles appear more than once in indices; unknown and malformed ids too
+    tconsts = pd.Index(
+        ["tt1160419", "tt0000042", "tt1160419", "tt0000002", "tt99999999", "nm0000001"],
+        name="tconst",
+    )
+    gathered = helpers.gather_ratings(helpers.open_ratings_array(file_path), tconsts)
+    expected = title_ratings.loc[tconsts.intersection(title_ratings.index)]
+
+    assert not gathered.index.has_duplicates
+    pd.testing.assert_frame_equal(gathered.sort_index(), expected.sort_index())
+
+
+def test_lookup_by_tconst_number(tmp_path):
+    file_path = str(tmp_path / "title.ratings.npy")
+    helpers.write_ratings_array(_title_ratings(), file_path)
+    ratings_array = helpers.open_ratings_array(file_path)
+
+    number: int = helpers.tconst_numbers(["tt0000042"])[0]
+    assert ratings_array[number]["averageRating"] == 7.25
+    assert ratings_array[number]["numVotes"] == 2000
+    assert ratings_array[2]["numVotes"] == helpers.VOTES_NULL
@@ -0,0 +1,113 @@
+import os
+import time
+import uuid
+
+import dagster as dg
+import pytest
+
+from imdb_dagster import retention
+from imdb_dagster.defs.assets import constants
+
+
+@dg.asset
+def kept() -> int:
+    return 1
+
+
+@dg.asset
+def removed() -> int:
+    return 2
+
+
+def _folder(path, modified, size=100):
+    os.makedirs(path)
+    with open(os.path.join(path, "data"), "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (modified, modified))
+    return str(path)
+
+
+def _add_run(instance, status):
+    run_id = str(uuid.uuid4())
+    instance.add_run(dg.DagsterRun(job_name="__ASSET_JOB", run_id=run_id, status=status))
+    return run_id
+
+
+@pytest.fixture
+def reasons(tmp_path, monkeypatch):
+    """Deletion (or protection) reason of every artifact of a small data tree."""
+    monkeypatch.chdir(tmp_path)
+    storage = tmp_path / "storage"
+    with dg.instance_for_test() as instance:
+        materialized = dg.materialize(
+            [kept, removed],
+            instance=instance,
+            resources={"io_manager": dg.FilesystemIOManager(base_dir=str(storage))},
+        )
+        _folder(storage / materialized.run_id, 1100)
+        _folder(storage / _add_run(instance, dg.DagsterRunStatus.STARTED), 1000)
+        finished = [_add_run(instance, dg.DagsterRunStatus.SUCCESS) for _ in range(4)]
+        for i, run_id in enumerate(finished):
+            _folder(storage / run_id, 2000 + i)
+        # Not a run of this instance
+        _folder(storage / "unknown", 500)
+
+        store = tmp_path / constants.QUERY_STORE_DIR_PATH
+        for i, version in enumerate(["v1", "v2", "v3", "v4"]):
+            _folder(store / version, 1000 + 1000 * (i > 0) + i)
+        (store / "CURRENT").write_text("v1")
+
+        os.makedirs(constants.DATA_DIR_PATH, exist_ok=True)
+        for name, age_hours in [("old.tmp", 24), ("new.download", 0)]:
+            path = os.path.join(constants.DATA_DIR_PATH, name)
+            open(path, "w").close()
+            modified = time.time() - age_hours * 3600
+            os.utime(path, (modified, modified))
+
+        # removed is gone from the graph, kept is not
+        asset_graph = dg.Definitions(assets=[kept]).resolve_asset_graph()
+        artifacts = retention.collect_artifacts(instance, asset_graph, str(storage))
+        retention.select_deletions(artifacts, keep_versions=2, max_bytes=None)
+
+    labels = {materialized.run_id: "materialized"}
+    labels.update({run_id: f"r{i + 1}" for i, run_id in enumerate(finished)})
+    reasons = {}
+    for artifact in artifacts:
+        name = os.path.basename(artifact.path)
+        reasons[labels.get(name, name)] = artifact.delete_reason or (
+            f"kept: {artifact.protected}" if artifact.protected else "kept"
+        )
+    return reasons
+
+
+def test_protected_artifacts_are_never_deleted(reasons):
+    assert reasons["kept"] == "kept: output of kept"
+    assert reasons["materialized"] == "kept: run of the latest kept"
+    assert reasons["v1"] == "kept: current query store version"
+    assert reasons["new.download"] == "kept: may still be written"
+    assert [reason for reason in reasons.values() if reason == "kept: run in progress"]
+    assert "unknown" not in reasons
+
+
+def test_old_versions_and_orphans_are_deleted(reasons):
+    # Only the newest two versions of the versioned stores are kept
+    assert [reasons[name] for name in ["r1", "r2", "v2"]] == ["older than the last 2 versions"] * 3
+    assert [reasons[name] for name in ["r3", "r4", "v3", "v4"]] == ["kept"] * 4
+    assert reasons["removed"] == "asset no longer in the graph"
+    assert reasons["old.tmp"] == "left over from an interrupted write"
+
+
+def test_size_cap_deletes_the_oldest_unprotected_artifacts():
+    artifacts = [
+        retention.Artifact("profiles", "oldest", 100, 1.0, protected="run in progress"),
+        retention.Artifact("profiles", "old", 100, 2.0),
+        retention.Artifact("run_storage", "newer", 100, 3.0),
+        retention.Artifact("run_storage", "newest", 100, 4.0),
+    ]
+
+    deleted = retention.select_deletions(artifacts, keep_versions=10, max_bytes=300)
+    assert [(a.path, a.delete_reason) for a in deleted] == [("old", "over the size cap")]
+
+    # Protected artifacts stay even when they alone exceed the cap
+    deleted = retention.select_deletions(artifacts, keep_versions=10, max_bytes=0)
+    assert [a.path for a in deleted] == ["old", "newer", "newest"]
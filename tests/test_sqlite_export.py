@@ -0,0 +1,62 @@
+import datetime
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pyarrow as pa
+
+from imdb_dagster import helpers
+
+
+def _reviews(dates):
+    return pd.DataFrame(
+        {
+            "date": pd.array(dates, dtype=pd.ArrowDtype(pa.date32())),
+            "enjoyment_score": pd.array(
+                [3.0, 3.0, 4.0, None, 2.0], dtype=pd.ArrowDtype(pa.float32())
+            ),
+        },
+        index=pd.Index(["tt01", "tt01", "tt02", "tt02", "tt03"], name="tconst"),
+    )
+
+
+def _export(conn, reviews):
+    return helpers.upsert_sqlite_table(
+        conn,
+        "movie_reviews",
+        helpers.review_table(reviews),
+        key_columns=["tconst", "date", "occurrence"],
+        index_columns=["date"],
+    )
+
+
+def test_repeated_and_undated_reviews_are_all_kept():
+    day = datetime.date(2026, 1, 9)
+    # tt01 twice on the same day with the same score, tt02 twice without a date
+    reviews = _reviews([day, day, None, None, day])
+
+    with closing(sqlite3.connect(":memory:")) as conn:
+        counts = _export(conn, reviews)
+        stored = conn.execute(
+            'SELECT tconst, date, occurrence, enjoyment_score FROM movie_reviews '
+            "ORDER BY tconst, date, occurrence"
+        ).fetchall()
+
+    assert counts == {"upserted": 5, "deleted": 0, "total": 5}
+    assert stored == [
+        ("tt01", "2026-01-09", 0, 3.0),
+        ("tt01", "2026-01-09", 1, 3.0),
+        ("tt02", "", 0, 4.0),
+        ("tt02", "", 1, None),
+        ("tt03", "2026-01-09", 0, 2.0),
+    ]
+
+
+def test_removing_a_repeated_review_deletes_one_row():
+    day = datetime.date(2026, 1, 9)
+    with closing(sqlite3.connect(":memory:")) as conn:
+        _export(conn, _reviews([day, day, None, None, day]))
+        counts = _export(conn, _reviews([day, day, None, None, day]).iloc[1:])
+        assert conn.execute("SELECT COUNT(*) FROM movie_reviews").fetchone() == (4,)
+
+    assert counts["deleted"] == 1
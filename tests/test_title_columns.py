@@ -0,0 +1,55 @@
+import dagster as dg
+import pandas as pd
+import pyarrow as pa
+
+from imdb_dagster import helpers
+from imdb_dagster.defs.assets.data_assets import intermediates
+
+
+def _title_basics(genres):
+    return pd.DataFrame(
+        {
+            "primaryTitle": ["Heat", "Amélie", "Ran"],
+            "originalTitle": ["Heat", "Le fabuleux destin d'Amélie Poulain", "Ran"],
+            "genres": genres,
+        },
+        index=pd.Index(["tt01", "tt02", "tt03"], name="tconst"),
+    )
+
+
+def _needed_title_basics(title_basics: pd.DataFrame, indices: pd.Index) -> pd.DataFrame:
+    result = dg.materialize(
+        [
+            intermediates.needed_title_basics,
+            dg.asset(name="title_basics")(lambda: title_basics),
+            dg.asset(name="indices")(lambda: indices),
+        ],
+        resources={"io_manager": dg.InMemoryIOManager()},
+    )
+    return result.output_for_node("needed_title_basics")
+
+
+def test_original_titles_are_restored_for_the_watch_list():
+    title_basics = helpers.compact_title_columns(
+        _title_basics(pd.array(["Crime,Drama", None, "Drama"], dtype=pd.ArrowDtype(pa.string())))
+    )
+    assert title_basics["originalTitle"].isna().tolist() == [True, False, True]
+
+    needed = _needed_title_basics(title_basics, pd.Index(["tt01", "tt02", "tt04"]))
+
+    assert needed["originalTitle"].tolist() == [
+        "Heat",
+        "Le fabuleux destin d'Amélie Poulain",
+    ]
+    assert needed["genre_Drama"].fillna(False).tolist() == [True, False]
+
+
+def test_all_na_genres():
+    # Read with the null type when no title in the dump has genres
+    title_basics = helpers.compact_title_columns(
+        _title_basics(pd.array([None, None, None], dtype=pd.ArrowDtype(pa.null())))
+    )
+
+    needed = _needed_title_basics(title_basics, pd.Index(["tt01", "tt03"]))
+
+    assert needed.columns.tolist() == ["primaryTitle", "originalTitle"]
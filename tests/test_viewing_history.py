@@ -0,0 +1,85 @@
+import copy
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from imdb_dagster.defs.assets.data_assets import analytics
+
+
+def _reviews(rows):
+    return pd.DataFrame(
+        {
+            "date": pd.array([row[1] for row in rows], dtype=pd.ArrowDtype(pa.date32())),
+            "enjoyment_score": pd.array(
+                [row[2] for row in rows], dtype=pd.ArrowDtype(pa.float32())
+            ),
+            "quality_score": pd.array([row[3] for row in rows], dtype=pd.ArrowDtype(pa.float32())),
+        },
+        index=pd.Index([row[0] for row in rows], name="tconst"),
+    )
+
+
+REVIEWS = [
+    ("tt01", datetime.date(2026, 1, 5), 3.0, None),
+    # tt02 is watched twice on the same day with the same scores
+    ("tt02", datetime.date(2026, 1, 9), 4.0, 2.0),
+    ("tt02", datetime.date(2026, 1, 9), 4.0, 2.0),
+    ("tt03", None, 2.0, 1.0),
+    ("tt01", datetime.date(2026, 2, 1), None, 5.0),
+]
+BASICS = pd.DataFrame(
+    {"genre_Drama": [True, False, True], "genre_Comedy": [True, True, False]},
+    index=pd.Index(["tt01", "tt02", "tt03"], name="tconst"),
+)
+RATINGS = pd.DataFrame(
+    {"averageRating": [7.5, 6.0, 8.0]}, index=pd.Index(["tt01", "tt02", "tt03"], name="tconst")
+)
+
+
+def _fresh(reviews, basics=BASICS, ratings=RATINGS):
+    return analytics.fold_history(None, reviews, basics, ratings)["state"]
+
+
+def _assert_same_aggregates(state, expected):
+    assert state["months"] == expected["months"]
+    for score in analytics.SCORE_COLUMNS:
+        assert state["correlation"][score] == pytest.approx(expected["correlation"][score])
+
+
+def test_identical_rows_hash_differently():
+    hashes = analytics.review_hashes(_reviews(REVIEWS))
+    assert len(set(hashes.tolist())) == len(REVIEWS)
+
+
+def test_appended_rows_are_folded_incrementally():
+    state = _fresh(_reviews(REVIEWS[:3]))
+    fold = analytics.fold_history(state, _reviews(REVIEWS), BASICS, RATINGS)
+
+    assert (fold["mode"], fold["folded_rows"], fold["changed_rows"]) == ("incremental", 2, 0)
+    _assert_same_aggregates(fold["state"], _fresh(_reviews(REVIEWS)))
+    assert fold["state"]["months"]["2026-01"]["watches"] == 3
+    assert fold["state"]["months"]["2026-01"]["genres"] == {"Comedy": 3, "Drama": 1}
+
+
+def test_ratings_refresh_only_recomputes_the_correlation():
+    state = _fresh(_reviews(REVIEWS))
+    months = copy.deepcopy(state["months"])
+    refreshed = RATINGS.assign(averageRating=[7.6, 6.0, 8.0])
+
+    fold = analytics.fold_history(state, _reviews(REVIEWS), BASICS, refreshed)
+
+    assert (fold["mode"], fold["folded_rows"], fold["changed_rows"]) == ("rerated", 0, 0)
+    assert fold["state"]["months"] == months
+    _assert_same_aggregates(fold["state"], _fresh(_reviews(REVIEWS), ratings=refreshed))
+
+
+def test_edited_row_rebuilds():
+    state = _fresh(_reviews(REVIEWS))
+    edited = [REVIEWS[0][:2] + (5.0, None)] + REVIEWS[1:]
+
+    fold = analytics.fold_history(state, _reviews(edited), BASICS, RATINGS)
+
+    assert (fold["mode"], fold["changed_rows"]) == ("full_rebuild", 1)
+    _assert_same_aggregates(fold["state"], _fresh(_reviews(edited)))